@@ -1,4 +1,6 @@
 # config.py
+import os
+
 DEFAULT_IMAGE_FORMATS = {
     '.bmp', '.gif', '.jpeg', '.jpg', '.png', '.heic'
 }
@@ -18,6 +20,33 @@ BACKUP_FOLDER_NAME = "backup_original"
 DEFAULT_OTHER_FILES_FOLDER = "无法识别格式"
 DEFAULT_NO_DATE_FOLDER = "无法识别日期"
 SETTINGS_FILE = "organizer_settings.json"
+METADATA_CACHE_FILE = "organizer_metadata_cache.db"
+RENAME_PLAN_FILE_NAME = ".organizer_rename_plan.json"
+JOURNAL_FILE_NAME = ".organizer_journal.jsonl"
+
+DEFAULT_SCAN_WORKERS = 8
+DEFAULT_METADATA_WORKERS = 4
+DEFAULT_PIPELINE_QUEUE_SIZE = 64
+DEFAULT_DATE_WORKERS = os.cpu_count() or 1
+DEFAULT_DATE_CHUNK_SIZE = 256
+DEFAULT_FFPROBE_WORKERS = 4
+DEFAULT_FFPROBE_TIMEOUT = 30
+DEFAULT_CACHE_BATCH_SIZE = 500
+METADATA_CACHE_MAX_ENTRIES = 200000
+DEDUP_PARTIAL_BLOCK_SIZE = 64 * 1024
+DEDUP_ACTIONS = ("delete", "hardlink", "reflink")
+DEFAULT_HASH_ALGORITHM = "md5"
+DEFAULT_HASH_WORKERS = 4
+HASH_BUFFER_SIZE = 1024 * 1024
+SAMPLING_PREFILTER_THRESHOLD = 10 * 1024 * 1024
+DEDUP_COMPARE_THRESHOLD = 64 * 1024 * 1024
+COMPARE_BLOCK_SIZE = 1024 * 1024
+PERCEPTUAL_HASH_SIZE = 8
+DEFAULT_NEAR_DUPLICATE_THRESHOLD = 6
+JOURNAL_FSYNC_INTERVAL = 256
+DEFAULT_ROLLBACK_WORKERS = 8
+DEFAULT_COPY_WORKERS = 4
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
 
 WINDOW_SIZES = {
     'main_window': '450x600',
@@ -0,0 +1,115 @@
+# dedup.py
+import os
+from collections import defaultdict
+
+from config import DEDUP_PARTIAL_BLOCK_SIZE, DEDUP_COMPARE_THRESHOLD
+from file_operations import FileOperations
+from hashing import ContentHasher, HashingPool
+
+
+class DuplicateDetector:
+    """全局重复文件检测：按大小分组 → 首尾块哈希 → 完整哈希，逐级缩小候选范围
+    超过比较阈值的大文件不做完整哈希，而是在候选组内逐块比较，遇到差异立即停止
+    """
+
+    def __init__(self, partial_block_size=None, hash_algorithm=None, hash_workers=None, compare_threshold=None):
+        self.partial_block_size = partial_block_size or DEDUP_PARTIAL_BLOCK_SIZE
+        self.compare_threshold = DEDUP_COMPARE_THRESHOLD if compare_threshold is None else compare_threshold
+        self.hasher = ContentHasher(hash_algorithm)
+        self.pool = HashingPool(self.hasher, hash_workers)
+
+    def find_duplicates(self, file_paths, check_terminate=None):
+        """查找内容完全相同的文件
+        返回 {重复文件: 保留文件}，每组保留路径排序最靠前的一个；被终止时返回空结果
+        """
+        sizes = {}
+        for size, paths in DuplicateDetector._group_by_size(file_paths).items():
+            for file_path in paths:
+                sizes[file_path] = size
+
+        if check_terminate and check_terminate():
+            return {}
+
+        partial_groups = self._group_by_hash(sizes, lambda file_path: self._partial_hash(file_path, sizes[file_path]))
+
+        if check_terminate and check_terminate():
+            return {}
+
+        confirmed_groups = []
+        needs_full_hash = {}
+        for group in partial_groups:
+            size = sizes[group[0]]
+            if size <= 2 * self.partial_block_size:
+                confirmed_groups.append(group)
+            elif size > self.compare_threshold:
+                if check_terminate and check_terminate():
+                    return {}
+                confirmed_groups.extend(DuplicateDetector._verify_by_comparison(group))
+            else:
+                for file_path in group:
+                    needs_full_hash[file_path] = sizes[file_path]
+
+        confirmed_groups.extend(self._group_by_hash(needs_full_hash, self.hasher.hash_file))
+
+        if check_terminate and check_terminate():
+            return {}
+
+        duplicate_map = {}
+        for group in confirmed_groups:
+            group.sort()
+            for duplicate in group[1:]:
+                duplicate_map[duplicate] = group[0]
+        return duplicate_map
+
+    @staticmethod
+    def _group_by_size(file_paths):
+        """按扫描阶段缓存的文件大小分组，只保留至少两个文件的非空分组
+        符号链接不参与去重：它与所指文件内容必然相同，删除其中任何一个都会丢失数据或留下失效链接
+        """
+        size_groups = defaultdict(list)
+        for file_path in file_paths:
+            try:
+                size = FileOperations.get_file_size(file_path)
+            except OSError:
+                continue
+            if size > 0:
+                size_groups[size].append(file_path)
+
+        groups = {}
+        for size, paths in size_groups.items():
+            if len(paths) > 1:
+                paths = [file_path for file_path in paths if not os.path.islink(file_path)]
+                if len(paths) > 1:
+                    groups[size] = paths
+        return groups
+
+    def _partial_hash(self, file_path, size):
+        """首尾块哈希；超过比较阈值的大文件再加一个中间块，作为逐块比较前的抽样过滤"""
+        if size <= self.compare_threshold:
+            return self.hasher.hash_head_tail(file_path, self.partial_block_size, size)
+        block = self.partial_block_size
+        return self.hasher.hash_ranges(file_path, [(0, block), ((size - block) // 2, block), (size - block, block)])
+
+    @staticmethod
+    def _verify_by_comparison(group):
+        """在候选组内逐块比较，把内容相同的文件聚成若干组"""
+        clusters = []
+        for file_path in sorted(group):
+            try:
+                for cluster in clusters:
+                    if FileOperations.compare_files(cluster[0], file_path):
+                        cluster.append(file_path)
+                        break
+                else:
+                    clusters.append([file_path])
+            except (OSError, IOError) as e:
+                print(f"比较文件内容失败 {file_path}: {str(e)}")
+        return [cluster for cluster in clusters if len(cluster) > 1]
+
+    def _group_by_hash(self, sizes, hash_func):
+        """用哈希池并发计算哈希，按 (大小, 哈希) 细分候选组；读取失败的文件不参与去重"""
+        hash_groups = defaultdict(list)
+        for file_path, digest in self.pool.map(sizes, hash_func):
+            if digest is not None:
+                hash_groups[(sizes[file_path], digest)].append(file_path)
+        return [group for group in hash_groups.values() if len(group) > 1]
@@ -0,0 +1,143 @@
+# exif_reader.py
+import struct
+
+from mapped_io import MappedFile
+
+
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD_POINTER = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+
+TIFF_TYPE_ASCII = 2
+
+JPEG_HEADER_READ_SIZE = 64 * 1024
+TIFF_HEADER_READ_SIZE = 256 * 1024
+
+
+class ExifDateReader:
+    """轻量 EXIF 日期读取器：通过内存映射只访问文件头部并直接定位日期标签，不依赖 Pillow"""
+
+    @staticmethod
+    def read_date_string(file_path):
+        """读取 DateTimeOriginal / DateTime 字符串
+        返回 (是否解析成功, 日期字符串)；解析失败时调用方应回退到 Pillow
+        """
+        with MappedFile(file_path) as mapped:
+            # 映射成功时段头遍历和 IFD 偏移可以覆盖整个文件，不受固定读取长度限制
+            window = mapped.size if mapped.is_mapped else None
+            head = mapped.read(0, window or JPEG_HEADER_READ_SIZE)
+
+            if head[:2] == b'\xff\xd8':
+                segment = ExifDateReader._find_jpeg_exif_segment(head)
+                if segment is None:
+                    return True, None
+                if segment is False:
+                    return False, None
+                start, end = segment
+                return ExifDateReader.parse_tiff_dates(mapped.read(start, end - start))
+
+            if head[:4] in (b'II*\x00', b'MM\x00*'):
+                return ExifDateReader.parse_tiff_dates(mapped.read(0, window or TIFF_HEADER_READ_SIZE))
+
+        return False, None
+
+    @staticmethod
+    def _find_jpeg_exif_segment(data):
+        """遍历 JPEG 段头，返回 APP1 Exif 段中 TIFF 数据的 (起始, 结束) 偏移
+        确定没有 Exif 段时返回 None，数据不足或结构异常时返回 False
+        """
+        pos = 2
+        length = len(data)
+        while pos + 4 <= length:
+            if data[pos] != 0xFF:
+                return False
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+                pos += 2
+                continue
+            if marker in (0xD9, 0xDA):
+                return None
+
+            segment_length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\x00\x00':
+                return pos + 10, pos + 2 + segment_length
+            pos += 2 + segment_length
+        return False
+
+    @staticmethod
+    def parse_tiff_dates(tiff):
+        """解析 TIFF 结构，只查找 IFD0 的 DateTime 和 Exif IFD 的 DateTimeOriginal"""
+        if len(tiff) < 8:
+            return False, None
+
+        byte_order = bytes(tiff[:2])
+        if byte_order == b'II':
+            endian = '<'
+        elif byte_order == b'MM':
+            endian = '>'
+        else:
+            return False, None
+
+        if struct.unpack(endian + 'H', tiff[2:4])[0] != 42:
+            return False, None
+
+        ifd0_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+        ifd0_tags = ExifDateReader._read_ifd_tags(tiff, ifd0_offset, endian,
+                                                  (TAG_DATETIME, TAG_EXIF_IFD_POINTER))
+        if ifd0_tags is None:
+            return False, None
+
+        date_original = None
+        exif_entry = ifd0_tags.get(TAG_EXIF_IFD_POINTER)
+        if exif_entry is not None:
+            exif_offset = struct.unpack(endian + 'I', exif_entry[2])[0]
+            exif_tags = ExifDateReader._read_ifd_tags(tiff, exif_offset, endian, (TAG_DATETIME_ORIGINAL,))
+            if exif_tags is None:
+                return False, None
+            date_original = ExifDateReader._read_ascii(tiff, exif_tags.get(TAG_DATETIME_ORIGINAL), endian)
+
+        date_str = date_original or ExifDateReader._read_ascii(tiff, ifd0_tags.get(TAG_DATETIME), endian)
+        return True, date_str
+
+    @staticmethod
+    def _read_ifd_tags(tiff, offset, endian, wanted_tags):
+        """读取 IFD 中指定标签的 (类型, 数量, 值/偏移原始字节)，越界时返回 None"""
+        if offset + 2 > len(tiff):
+            return None
+        entry_count = struct.unpack(endian + 'H', tiff[offset:offset + 2])[0]
+        entries_end = offset + 2 + entry_count * 12
+        if entries_end > len(tiff):
+            return None
+
+        found = {}
+        for entry_offset in range(offset + 2, entries_end, 12):
+            tag = struct.unpack(endian + 'H', tiff[entry_offset:entry_offset + 2])[0]
+            if tag in wanted_tags:
+                value_type, count = struct.unpack(endian + 'HI', tiff[entry_offset + 2:entry_offset + 8])
+                found[tag] = (value_type, count, bytes(tiff[entry_offset + 8:entry_offset + 12]))
+                if len(found) == len(wanted_tags):
+                    break
+        return found
+
+    @staticmethod
+    def _read_ascii(tiff, entry, endian):
+        """读取 ASCII 类型标签的字符串值"""
+        if entry is None:
+            return None
+        value_type, count, raw_value = entry
+        if value_type != TIFF_TYPE_ASCII or count == 0:
+            return None
+
+        if count <= 4:
+            raw = raw_value[:count]
+        else:
+            value_offset = struct.unpack(endian + 'I', raw_value)[0]
+            if value_offset + count > len(tiff):
+                return None
+            raw = bytes(tiff[value_offset:value_offset + count])
+
+        value = raw.split(b'\x00', 1)[0].decode('ascii', errors='ignore').strip()
+        return value or None
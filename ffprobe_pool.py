@@ -0,0 +1,68 @@
+# ffprobe_pool.py
+import json
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import DEFAULT_FFPROBE_WORKERS, DEFAULT_FFPROBE_TIMEOUT
+
+
+class FFprobePool:
+    """ffprobe 执行池：限制并发数，只请求日期相关标签，并为每个文件设置超时
+    多个进程各自持有执行池时，可传入同一个进程间信号量 slots，使总并发数不超过设定值
+    """
+
+    PROBE_TAGS = ('creation_time', 'date', 'time', 'DATE')
+
+    def __init__(self, max_workers=None, timeout=None, slots=None):
+        self.max_workers = max(1, max_workers or DEFAULT_FFPROBE_WORKERS)
+        self.timeout = timeout or DEFAULT_FFPROBE_TIMEOUT
+        self._slots = slots if slots is not None else threading.BoundedSemaphore(self.max_workers)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @staticmethod
+    def build_command(file_path):
+        """构造只输出容器日期标签的 ffprobe 命令"""
+        return [
+            'ffprobe', '-v', 'quiet', '-print_format', 'json',
+            '-show_entries', 'format_tags=' + ','.join(FFprobePool.PROBE_TAGS), file_path
+        ]
+
+    def probe_tags(self, file_path):
+        """运行一次 ffprobe 并返回格式标签字典，超时或失败时返回 None"""
+        with self._slots:
+            try:
+                result = subprocess.run(FFprobePool.build_command(file_path), capture_output=True,
+                                        text=True, check=True, timeout=self.timeout)
+                metadata = json.loads(result.stdout or '{}')
+                return metadata.get('format', {}).get('tags', {})
+            except subprocess.TimeoutExpired:
+                print(f"ffprobe 超时 ({self.timeout}s) {file_path}")
+            except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError) as e:
+                print(f"提取视频元数据失败 {file_path}: {str(e)}")
+            except Exception as e:
+                print(f"未知错误提取视频元数据 {file_path}: {str(e)}")
+        return None
+
+    def probe_many(self, file_paths):
+        """并发探测多个文件，逐个产出 (路径, 标签字典)；调用方提前关闭生成器时取消尚未开始的探测"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            executor = self._executor
+
+        futures = {executor.submit(self.probe_tags, file_path): file_path for file_path in file_paths}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        """关闭工作线程"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
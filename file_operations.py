@@ -4,90 +4,92 @@ import shutil
 import zipfile
 import hashlib
 from datetime import datetime
-from pathlib import Path
-import re
-import threading
-from collections import defaultdict
 import time
 
+from filename_dates import match_filename_date, match_filename_dates
+from hashing import ContentHasher
+from mapped_io import MappedFile
+from move_engine import move_file
+from config import SAMPLING_PREFILTER_THRESHOLD, COMPARE_BLOCK_SIZE
+
+
+# Linux FICLONE ioctl 请求号，用于 btrfs/XFS 等文件系统的写时复制克隆
+FICLONE = 0x40049409
+
 
 class FileOperations:
     """文件操作工具类"""
 
-    _metadata_cache = {}
-    _cache_lock = threading.Lock()
-
-    _scan_threads = []
-    _scan_results = defaultdict(list)
-    _scan_progress = {'total': 0, 'scanned': 0}
+    _stat_cache = {}
+    _md5_hasher = ContentHasher('md5')
     
     @staticmethod
     def extract_date_from_filename(filename):
         """尝试从文件名模式中提取日期 - 增强精度版本"""
+        return match_filename_date(filename)
 
-        patterns = [
-            r'(IMG_|VID_|PANO_|MVIMG_)(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})',
-            
-            r'(\d{4})[-_]?(\d{2})[-_]?(\d{2})',
+    @staticmethod
+    def extract_dates_from_filenames(filenames):
+        """批量从文件名中提取日期，返回与输入顺序一致的列表"""
+        return match_filename_dates(filenames)
 
-            r'(Screenshot_|Photo_|Video_|Recording_)(\d{4})(\d{2})(\d{2})',
+    @staticmethod
+    def cache_file_stat(file_path, stat_result):
+        """记录扫描阶段得到的文件状态，后续阶段无需再次 stat
+        只保留 (大小, 纳秒修改时间, inode) 三个整数；Windows 上 DirEntry.stat() 的 st_ino 恒为 0，记为 None 待需要时再取
+        """
+        FileOperations._stat_cache[file_path] = (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino or None)
 
-            r'(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})',
+    @staticmethod
+    def _cached_stat(file_path):
+        """缓存的 (大小, 纳秒修改时间, inode)，未缓存时直接 stat"""
+        cached = FileOperations._stat_cache.get(file_path)
+        if cached is None:
+            stat_result = os.stat(file_path)
+            cached = (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+        return cached
 
-            r'(\d{4})[-_]?(\d{2})(?!\d)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, filename, re.IGNORECASE)
-            if match:
-                try:
-                    groups = match.groups()
-                    
-                    if len(groups) >= 4 and groups[0] in ('IMG_', 'VID_', 'PANO_', 'MVIMG_', 'Screenshot_', 'Photo_', 'Video_', 'Recording_'):
-                        year, month, day = groups[1], groups[2], groups[3]
-                        return FileOperations._validate_and_create_date(year, month, day)
+    @staticmethod
+    def get_file_size(file_path):
+        """获取文件大小，优先使用扫描阶段缓存的结果"""
+        return FileOperations._cached_stat(file_path)[0]
 
-                    elif len(groups) >= 3:
-                        year, month, day = groups[0], groups[1], groups[2]
-                        return FileOperations._validate_and_create_date(year, month, day)
+    @staticmethod
+    def get_file_mtime(file_path):
+        """获取文件修改时间（秒），优先使用扫描阶段缓存的结果"""
+        return FileOperations._cached_stat(file_path)[1] / 1e9
 
-                    elif len(groups) == 2:
-                        year, month = groups[0], groups[1]
-                        return FileOperations._validate_and_create_date(year, month, "01")
-                        
-                except (ValueError, TypeError) as e:
-                    continue
-                    
-        return None
-    
     @staticmethod
-    def _validate_and_create_date(year_str, month_str, day_str="01"):
-        """验证并创建日期对象"""
-        try:
-            if len(year_str) == 2:
-                year_int = int(year_str)
-                year_str = '20' + year_str if year_int < 50 else '19' + year_str
-            
-            year = int(year_str)
-            month = int(month_str)
-            day = int(day_str)
-
-            if (1900 <= year <= 2100 and 
-                1 <= month <= 12 and 
-                1 <= day <= 31):
-                return datetime(year, month, day)
-                
-        except (ValueError, TypeError):
-            pass
-            
-        return None
+    def get_file_signature(file_path):
+        """文件指纹 (大小, 纳秒修改时间, inode)；缓存中缺少 inode 时用 os.stat 补齐，与子进程中直接 stat 的结果一致"""
+        cached = FileOperations._cached_stat(file_path)
+        if cached[2] is None:
+            stat_result = os.stat(file_path)
+            cached = (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+            if file_path in FileOperations._stat_cache:
+                FileOperations._stat_cache[file_path] = cached
+        return cached
+
+    @staticmethod
+    def get_file_stat(file_path):
+        """获取完整的文件状态（创建时间、访问时间等不在缓存中的字段）"""
+        return os.stat(file_path)
+
+    @staticmethod
+    def forget_file_stat(file_path):
+        """文件被移动或删除后丢弃其缓存的状态"""
+        FileOperations._stat_cache.pop(file_path, None)
+
+    @staticmethod
+    def clear_stat_cache():
+        """清空文件状态缓存"""
+        FileOperations._stat_cache.clear()
 
     @staticmethod
     def get_file_modification_time(file_path):
         """获取文件修改时间，有回退机制"""
         try:
-            stat = os.stat(file_path)
-            mod_time = stat.st_mtime
+            mod_time = FileOperations.get_file_mtime(file_path)
             return datetime.fromtimestamp(mod_time)
         except (OSError, IOError) as e:
             print(f"获取文件修改时间失败 {file_path}: {str(e)}")
@@ -100,7 +102,7 @@ class FileOperations:
     def get_file_creation_time(file_path):
         """获取文件创建时间"""
         try:
-            stat = os.stat(file_path)
+            stat = FileOperations.get_file_stat(file_path)
             create_time = stat.st_ctime
             return datetime.fromtimestamp(create_time)
         except (OSError, IOError) as e:
@@ -114,7 +116,7 @@ class FileOperations:
     def get_file_system_metadata_time(file_path):
         """获取文件系统元数据时间（最后访问时间等）"""
         try:
-            stat = os.stat(file_path)
+            stat = FileOperations.get_file_stat(file_path)
             access_time = stat.st_atime
             return datetime.fromtimestamp(access_time)
         except (OSError, IOError) as e:
@@ -193,12 +195,13 @@ class FileOperations:
     
     @staticmethod
     def safe_move(src, dst):
-        """安全移动文件，如果需要则创建目录，并删除源目录中的空父目录"""
+        """安全移动文件，如果需要则创建目录；同设备直接改名，跨设备复制并校验大小后删除源文件
+        源目录变空后不在这里删除，由调用方在运行结束时统一清理
+        """
         try:
             os.makedirs(os.path.dirname(dst), exist_ok=True)
-            shutil.move(src, dst)
-            
-            FileOperations.remove_empty_dir(os.path.dirname(src))
+            move_file(src, dst)
+            FileOperations.forget_file_stat(src)
         except (OSError, IOError, shutil.Error) as e:
             print(f"移动文件失败 {src} -> {dst}: {str(e)}")
             raise e
@@ -207,15 +210,84 @@ class FileOperations:
             raise e
 
     @staticmethod
-    def remove_empty_dir(directory):
-        """递归删除所有空的父目录"""
-        while directory and directory != os.path.dirname(directory):
+    def replace_with_link(duplicate, keeper, mode="hardlink"):
+        """用指向保留文件的链接替换重复文件，两个路径都保留但只占用一份空间
+        mode 为 "reflink" 时优先尝试写时复制克隆（btrfs/XFS 的 FICLONE），失败后回退到硬链接；
+        先在同目录生成临时链接再 os.replace 原子替换，全部失败时保留原文件并返回 None，否则返回实际使用的方式
+        """
+        directory, name = os.path.split(duplicate)
+        temp_path = os.path.join(directory, f".{name}.link.tmp")
+
+        methods = ["reflink", "hardlink"] if mode == "reflink" else ["hardlink"]
+        for method in methods:
             try:
-                os.rmdir(directory)
-                directory = os.path.dirname(directory)
+                if method == "reflink":
+                    FileOperations._clone_file(keeper, temp_path)
+                    shutil.copystat(duplicate, temp_path)
+                else:
+                    os.link(keeper, temp_path)
+                os.replace(temp_path, duplicate)
+                FileOperations.forget_file_stat(duplicate)
+                return method
+            except (OSError, IOError, ImportError) as e:
+                print(f"{method} 替换重复文件失败 {duplicate} -> {keeper}: {str(e)}")
+                try:
+                    if os.path.lexists(temp_path):
+                        os.remove(temp_path)
+                except OSError:
+                    pass
+        return None
+
+    @staticmethod
+    def _clone_file(src, dst):
+        """通过 FICLONE ioctl 创建共享数据块的克隆文件，文件系统不支持时抛出 OSError"""
+        import fcntl
+
+        with open(src, 'rb') as src_file, open(dst, 'xb') as dst_file:
+            try:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
             except OSError:
-                break
-    
+                dst_file.close()
+                os.remove(dst)
+                raise
+
+    @staticmethod
+    def restore_independent_copy(duplicate, keeper):
+        """回退链接替换：用保留文件内容的独立副本替换链接，保留链接路径原有的时间戳"""
+        directory, name = os.path.split(duplicate)
+        temp_path = os.path.join(directory, f".{name}.restore.tmp")
+        try:
+            shutil.copyfile(keeper, temp_path)
+            if os.path.exists(duplicate):
+                shutil.copystat(duplicate, temp_path)
+            os.replace(temp_path, duplicate)
+            FileOperations.forget_file_stat(duplicate)
+        except (OSError, IOError, shutil.Error) as e:
+            print(f"恢复独立副本失败 {duplicate}: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise e
+
+    @staticmethod
+    def prune_empty_dirs(directories, root, keep=()):
+        """只检查给定的目录：由深到浅删除空目录，并沿父目录向上直到 root（root 和 keep 中的目录保留）
+        返回删除的目录列表
+        """
+        root = os.path.abspath(root)
+        keep = {os.path.abspath(directory) for directory in keep}
+        removed = []
+        candidates = sorted({os.path.abspath(directory) for directory in directories},
+                            key=lambda path: path.count(os.sep), reverse=True)
+        for directory in candidates:
+            while directory != root and directory not in keep and directory.startswith(root + os.sep):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                removed.append(directory)
+                directory = os.path.dirname(directory)
+        return removed
+
     @staticmethod
     def get_sequence_format(total_files):
         """根据总文件数确定序列号格式"""
@@ -244,19 +316,10 @@ class FileOperations:
             counter += 1
     
     @staticmethod
-    def calculate_md5(file_path, block_size=65536):
-        """计算文件的MD5哈希值 - 优化大文件处理"""
-        hash_md5 = hashlib.md5()
+    def calculate_md5(file_path):
+        """计算文件完整内容的MD5哈希值"""
         try:
-            file_size = os.path.getsize(file_path)
-
-            if file_size > 10 * 1024 * 1024: 
-                return FileOperations._calculate_sampling_hash(file_path)
-
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(block_size), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            return FileOperations._md5_hasher.hash_file(file_path)
         except (OSError, IOError) as e:
             print(f"计算MD5失败 {file_path}: {str(e)}")
             return None
@@ -267,11 +330,11 @@ class FileOperations:
     @staticmethod
     def _calculate_sampling_hash(file_path, sample_size=3):
         """对大文件使用抽样哈希算法"""
-        file_size = os.path.getsize(file_path)
+        file_size = FileOperations.get_file_size(file_path)
         hash_md5 = hashlib.md5()
         
         try:
-            with open(file_path, "rb") as f:
+            with MappedFile(file_path) as mapped:
                 sample_positions = [
                     0,  
                     file_size // 2,  
@@ -284,10 +347,7 @@ class FileOperations:
                     if pos >= file_size:
                         continue
                         
-                    f.seek(pos)
-                    sample = f.read(4096)  
-                    if sample:
-                        hash_md5.update(sample)
+                    hash_md5.update(mapped.read(pos, 4096))
 
                 hash_md5.update(str(file_size).encode())
                 
@@ -297,122 +357,59 @@ class FileOperations:
             return None
     
     @staticmethod
-    def are_files_identical(file1, file2):
-        """检查两个文件是否完全相同（通过优化哈希）"""
+    def compare_files(file1, file2, block_size=None):
+        """逐块比较两个文件的内容，遇到第一个不同的块立即返回 False"""
+        block_size = block_size or COMPARE_BLOCK_SIZE
+        buffer1 = bytearray(block_size)
+        buffer2 = bytearray(block_size)
+
+        with open(file1, 'rb', buffering=0) as f1, open(file2, 'rb', buffering=0) as f2:
+            while True:
+                count1 = FileOperations._read_block(f1, buffer1)
+                count2 = FileOperations._read_block(f2, buffer2)
+                if count1 != count2:
+                    return False
+                if count1 < block_size:
+                    return buffer1[:count1] == buffer2[:count2]
+                if buffer1 != buffer2:
+                    return False
+
+    @staticmethod
+    def _read_block(f, buffer):
+        """读满整个缓冲区（文件末尾除外），返回实际读取的字节数"""
+        view = memoryview(buffer)
+        total = 0
+        while total < len(buffer):
+            count = f.readinto(view[total:])
+            if not count:
+                break
+            total += count
+        return total
+
+    @staticmethod
+    def are_files_identical(file1, file2, sampling_threshold=None):
+        """检查两个文件是否完全相同
+        先比较大小，超过阈值的大文件用抽样哈希快速排除，最终都通过逐块比较确认
+        """
+        if sampling_threshold is None:
+            sampling_threshold = SAMPLING_PREFILTER_THRESHOLD
 
         try:
-            size1 = os.path.getsize(file1)
-            size2 = os.path.getsize(file2)
+            size1 = FileOperations.get_file_size(file1)
+            size2 = FileOperations.get_file_size(file2)
             if size1 != size2:
                 return False
 
-            if size1 > 10 * 1024 * 1024:
+            if size1 > sampling_threshold:
                 hash1 = FileOperations._calculate_sampling_hash(file1)
                 hash2 = FileOperations._calculate_sampling_hash(file2)
-            else:
-                hash1 = FileOperations.calculate_md5(file1)
-                hash2 = FileOperations.calculate_md5(file2)
-            
-            if hash1 and hash2 and hash1 == hash2:
-                return True
-            return False
+                if not hash1 or not hash2 or hash1 != hash2:
+                    return False
+
+            return FileOperations.compare_files(file1, file2)
         except (OSError, IOError) as e:
             print(f"检查文件相同性失败 {file1}, {file2}: {str(e)}")
             return False
         except Exception as e:
             print(f"未知错误检查文件相同性 {file1}, {file2}: {str(e)}")
             return False
-    
-    @staticmethod
-    def scan_directory_threaded(directory, file_formats, progress_callback=None):
-        """多线程扫描目录 - 修复文件计数问题"""
-        FileOperations._scan_results.clear()
-        FileOperations._scan_progress = {'total': 0, 'scanned': 0}
-        FileOperations._scan_threads = []
-
-        total_files = 0
-        for root, dirs, files in os.walk(directory):
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            for file in files:
-                if file.startswith('.'):
-                    continue
-                file_ext = Path(file).suffix.lower()
-                found = False
-                for formats in file_formats.values():
-                    if file_ext in formats:
-                        found = True
-                        break
-                if not found:
-                    found = True
-                if found:
-                    total_files += 1
-        
-        FileOperations._scan_progress['total'] = total_files
-
-        thread_count = min(4, os.cpu_count() or 1) 
-        chunks = FileOperations._split_directory_scan(directory, thread_count)
-        
-        for i, chunk_dirs in enumerate(chunks):
-            thread = threading.Thread(
-                target=FileOperations._scan_worker,
-                args=(chunk_dirs, file_formats, i)
-            )
-            FileOperations._scan_threads.append(thread)
-            thread.daemon = True
-            thread.start()
-
-        for thread in FileOperations._scan_threads:
-            thread.join()
-
-        final_results = {}
-        for file_type in file_formats.keys():
-            final_results[file_type] = list(set(FileOperations._scan_results[file_type]))
-        
-        return final_results
-    
-    @staticmethod
-    def _split_directory_scan(directory, num_chunks):
-        """将目录扫描任务分割成多个块"""
-        all_dirs = [directory]
-
-        for root, dirs, _ in os.walk(directory):
-            dirs[:] = [d for d in dirs if not d.startswith('.')]
-            for d in dirs:
-                all_dirs.append(os.path.join(root, d))
-
-        chunk_size = max(1, len(all_dirs) // num_chunks)
-        chunks = [all_dirs[i:i + chunk_size] for i in range(0, len(all_dirs), chunk_size)]
-        
-        return chunks[:num_chunks]  
-    
-    @staticmethod
-    def _scan_worker(directories, file_formats, thread_id):
-        """扫描工作线程 - 修复文件分类逻辑"""
-        for directory in directories:
-            try:
-                for root, dirs, files in os.walk(directory):
-                    dirs[:] = [d for d in dirs if not d.startswith('.')]
-                    
-                    for file in files:
-                        if file.startswith('.'):
-                            continue
-                            
-                        file_path = os.path.join(root, file)
-                        file_ext = Path(file).suffix.lower()
-                        
-                        with FileOperations._cache_lock:
-                            FileOperations._scan_progress['scanned'] += 1
-                        
-                        found = False
-                        for file_type, formats in file_formats.items():
-                            if file_ext in formats:
-                                with FileOperations._cache_lock:
-                                    FileOperations._scan_results[file_type].append(file_path)
-                                found = True
-                                break
-
-                        if not found:
-                            with FileOperations._cache_lock:
-                                FileOperations._scan_results['other'].append(file_path)
-            except Exception as e:
-                print(f"扫描线程 {thread_id} 错误: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,133 @@
+# filename_dates.py
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+
+
+# 单个预编译正则，按分支识别：
+#   epoch_ms   微信导出 mmexport1609459200000 / wx_camera_1609459200000（毫秒时间戳）
+#   year/month/day  完整日期，覆盖 IMG_/VID_/PXL_/PANO_/MVIMG_20200101_120000、
+#                   WhatsApp IMG-20200101-WA0001、signal-2020-01-01-120000、
+#                   Screenshot_2020-01-01、photo_2020-01-01_10-00-00、2020.01.01 等
+#   ym_year/ym_month  仅年月，如 trip_2020_05
+FILENAME_DATE_PATTERN = re.compile(
+    r'(?:mmexport|wx_camera_)(?P<epoch_ms>1\d{12})(?!\d)'
+    r'|(?P<year>(?:19|20)\d{2})[-_.]?(?P<month>0[1-9]|1[0-2])[-_.]?(?P<day>0[1-9]|[12]\d|3[01])'
+    r'|(?P<ym_year>(?:19|20)\d{2})[-_]?(?P<ym_month>0[1-9]|1[0-2])(?!\d)',
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=4096)
+def _date_from_text(kind, text):
+    """把匹配到的日期文本转换为 (日期, 是否仅年月)；同一天的文件很多，结果按文本缓存"""
+    try:
+        if kind == 'day':
+            digits = ''.join(ch for ch in text if ch.isdigit())
+            return datetime(int(digits[:4]), int(digits[4:6]), int(digits[6:8])), False
+        if kind == 'ym_month':
+            digits = ''.join(ch for ch in text if ch.isdigit())
+            return datetime(int(digits[:4]), int(digits[4:6]), 1), True
+        if kind == 'epoch_ms':
+            timestamp = datetime.fromtimestamp(int(text[-13:]) / 1000)
+            return datetime(timestamp.year, timestamp.month, timestamp.day), False
+    except (ValueError, OverflowError, OSError):
+        pass
+    return None, False
+
+
+def _date_from_match(match):
+    """把匹配结果转换为 (日期, 是否仅年月)，日期无效时返回 (None, False)"""
+    return _date_from_text(match.lastgroup, match.group())
+
+
+def match_filename_date(filename):
+    """从文件名中提取日期：优先返回第一个有效的完整日期，否则返回第一个年月"""
+    month_only = None
+    for match in FILENAME_DATE_PATTERN.finditer(filename):
+        date, is_month_only = _date_from_match(match)
+        if date is None:
+            continue
+        if not is_month_only:
+            return date
+        if month_only is None:
+            month_only = date
+    return month_only
+
+
+def match_filename_dates(filenames):
+    """批量提取文件名日期，返回与输入顺序一致的列表
+    大多数文件名只有一个匹配，先用 search 取首个匹配并直接复用缓存结果，只有需要继续查找时才回退到逐个匹配
+    """
+    search = FILENAME_DATE_PATTERN.search
+    convert = _date_from_match
+    results = []
+    append = results.append
+    for filename in filenames:
+        match = search(filename)
+        if match is None:
+            append(None)
+            continue
+        date, is_month_only = convert(match)
+        if date is not None and not is_month_only:
+            append(date)
+        else:
+            append(match_filename_date(filename))
+    return results
+
+
+def benchmark(count=200000, repeat=3):
+    """对比旧的逐个正则匹配实现与新匹配器的吞吐量（文件名/秒）"""
+    legacy_patterns = [
+        r'(IMG_|VID_|PANO_|MVIMG_)(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})',
+        r'(\d{4})[-_]?(\d{2})[-_]?(\d{2})',
+        r'(Screenshot_|Photo_|Video_|Recording_)(\d{4})(\d{2})(\d{2})',
+        r'(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})',
+        r'(\d{4})[-_]?(\d{2})(?!\d)',
+    ]
+
+    def legacy_match(filename):
+        for pattern in legacy_patterns:
+            match = re.search(pattern, filename, re.IGNORECASE)
+            if match:
+                groups = match.groups()
+                try:
+                    if len(groups) >= 4 and groups[0] in ('IMG_', 'VID_', 'PANO_', 'MVIMG_', 'Screenshot_',
+                                                          'Photo_', 'Video_', 'Recording_'):
+                        return datetime(int(groups[1]), int(groups[2]), int(groups[3]))
+                    if len(groups) >= 3:
+                        return datetime(int(groups[0]), int(groups[1]), int(groups[2]))
+                    return datetime(int(groups[0]), int(groups[1]), 1)
+                except ValueError:
+                    return None
+        return None
+
+    samples = [
+        'IMG_20230415_101530.jpg', 'VID_20221231_235959.mp4', 'PXL_20240102_083000123.jpg',
+        'IMG-20230708-WA0012.jpg', 'signal-2023-03-04-120000.jpg', 'Screenshot_2023-11-05-09-10-11.png',
+        'mmexport1672531200000.jpg', 'DSC_0042.JPG', 'holiday photo.png', 'trip_2021_07.mov',
+    ]
+    filenames = [samples[i % len(samples)] for i in range(count)]
+
+    def measure(func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return count / best
+
+    results = {
+        'legacy': measure(lambda: [legacy_match(name) for name in filenames]),
+        'single': measure(lambda: [match_filename_date(name) for name in filenames]),
+        'batch': measure(lambda: match_filename_dates(filenames)),
+    }
+    for name, rate in results.items():
+        print(f"{name:>8}: {rate:,.0f} 文件名/秒 ({rate / results['legacy']:.1f}x)")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
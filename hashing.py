@@ -0,0 +1,89 @@
+# hashing.py
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DEFAULT_HASH_ALGORITHM, DEFAULT_HASH_WORKERS, HASH_BUFFER_SIZE
+from mapped_io import MappedFile
+
+
+HASH_ALGORITHMS = {
+    'md5': hashlib.md5,
+    'blake2b': hashlib.blake2b,
+    'sha256': hashlib.sha256,
+}
+
+
+class ContentHasher:
+    """文件内容哈希器：支持 MD5 / BLAKE2b / SHA-256，优先内存映射读取，无法映射时每个线程复用一块缓冲区 readinto"""
+
+    def __init__(self, algorithm=None, buffer_size=None):
+        algorithm = (algorithm or DEFAULT_HASH_ALGORITHM).lower()
+        if algorithm not in HASH_ALGORITHMS:
+            raise ValueError(f"不支持的哈希算法: {algorithm}")
+        self.algorithm = algorithm
+        self.buffer_size = buffer_size or HASH_BUFFER_SIZE
+        self._local = threading.local()
+
+    def new(self):
+        """创建一个新的哈希对象"""
+        return HASH_ALGORITHMS[self.algorithm]()
+
+    def _buffer(self):
+        """当前线程的复用缓冲区，仅在文件无法内存映射时使用"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = bytearray(self.buffer_size)
+            self._local.buffer = buffer
+        return buffer
+
+    def hash_file(self, file_path):
+        """计算整个文件的哈希，返回十六进制字符串"""
+        return self.hash_ranges(file_path, [(0, None)])
+
+    def hash_ranges(self, file_path, ranges):
+        """只哈希指定的 (偏移, 长度) 区间，长度为 None 表示到文件末尾；用于首尾块等部分哈希
+        文件以内存映射方式读取，memoryview 切片直接送入 hashlib
+        """
+        hasher = self.new()
+        with MappedFile(file_path) as mapped:
+            buffer = None if mapped.is_mapped else self._buffer()
+            for offset, length in ranges:
+                for chunk in mapped.iter_chunks(offset, length, self.buffer_size, buffer):
+                    hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def hash_head_tail(self, file_path, block_size, size=None):
+        """哈希首尾两个数据块；文件不超过两个块时等同于完整哈希"""
+        if size is None:
+            size = os.stat(file_path).st_size
+        if size <= 2 * block_size:
+            return self.hash_file(file_path)
+        return self.hash_ranges(file_path, [(0, block_size), (size - block_size, block_size)])
+
+
+class HashingPool:
+    """多线程哈希服务：hashlib 对大块数据计算时会释放 GIL，多个文件可以同时读盘和计算"""
+
+    def __init__(self, hasher=None, max_workers=None):
+        self.hasher = hasher or ContentHasher()
+        self.max_workers = max(1, max_workers or DEFAULT_HASH_WORKERS)
+
+    def _safe_call(self, hash_func, file_path):
+        try:
+            return hash_func(file_path)
+        except (OSError, IOError) as e:
+            print(f"计算哈希失败 {file_path}: {str(e)}")
+            return None
+
+    def map(self, file_paths, hash_func=None):
+        """并发计算一组文件的哈希，按输入顺序返回 [(路径, 哈希或 None)]"""
+        hash_func = hash_func or self.hasher.hash_file
+        file_paths = list(file_paths)
+        if self.max_workers == 1 or len(file_paths) < 2:
+            return [(file_path, self._safe_call(hash_func, file_path)) for file_path in file_paths]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(file_paths))) as executor:
+            digests = executor.map(lambda file_path: self._safe_call(hash_func, file_path), file_paths)
+            return list(zip(file_paths, digests))
@@ -0,0 +1,71 @@
+# lru_cache.py
+import threading
+from collections import OrderedDict
+
+
+class BoundedLRUCache:
+    """线程安全的有界 LRU 缓存，记录命中、未命中和淘汰次数"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max(1, int(max_entries))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key):
+        """查询缓存，返回 (是否命中, 值)；命中的条目移到最近使用端"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key, value):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """删除并返回指定条目"""
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def resize(self, max_entries):
+        """调整容量，缩小时立即淘汰多余条目"""
+        with self._lock:
+            self.max_entries = max(1, int(max_entries))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存和统计计数"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def __len__(self):
+        return len(self._data)
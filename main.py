@@ -4,6 +4,7 @@ from tkinter import ttk, filedialog, messagebox
 import os
 import threading
 import time
+import multiprocessing
 import re
 import base64
 from io import BytesIO
@@ -485,6 +486,19 @@ class BatchFileOrganizerApp:
             else:
                 return
 
+        recovery_action = None
+        interrupted_run = self.organizer.find_interrupted_run(dest_dir)
+        if interrupted_run is not None:
+            answer = messagebox.askyesnocancel(
+                "发现未完成的整理",
+                f"目标目录中留有上次中断的整理记录：已完成 {len(interrupted_run.completed_operations())} 项操作，"
+                f"还有 {len(interrupted_run.pending_moves())} 个文件未移动。\n\n"
+                "是：先完成剩余的移动\n否：先回退上次已完成的操作\n取消：暂不整理"
+            )
+            if answer is None:
+                return
+            recovery_action = "resume" if answer else "rollback"
+
         if not self.backup_var.get():
             result = messagebox.askyesno(
                 "备份提示", 
@@ -509,7 +523,7 @@ class BatchFileOrganizerApp:
         self.start_time = time.time()
         self.total_estimated_time = 0 
 
-        thread = threading.Thread(target=self._organize_thread, args=(source_dir, dest_dir))
+        thread = threading.Thread(target=self._organize_thread, args=(source_dir, dest_dir, recovery_action))
         thread.daemon = True
         thread.start()
         
@@ -576,11 +590,17 @@ class BatchFileOrganizerApp:
             self.status_var.set("就绪")
 
 
-    def _organize_thread(self, source_dir, dest_dir):
+    def _organize_thread(self, source_dir, dest_dir, recovery_action=None):
         """在后台线程中执行整理操作"""
         exception_obj = None  
         
         try:
+            if recovery_action:
+                self.log(f"\n--- {'继续完成' if recovery_action == 'resume' else '回退'}上次中断的整理 ---", 'Progress')
+                recovered = self.organizer.recover_interrupted_run(dest_dir, recovery_action, progress_callback=self._update_progress_and_log)
+                self.log(f"已处理 {recovered} 项中断遗留的操作", 'Success')
+                self.organizer.reset_state()
+
             result = self.organizer.organize_media(
                 source_dir, 
                 dest_dir,
@@ -594,18 +614,21 @@ class BatchFileOrganizerApp:
                 self.root.after(0, lambda: messagebox.showwarning("终止", "整理操作已终止并已回退更改。"))
                 return
 
-            self.log("\n--- 开始重新整理目标目录以确保连续序号 (耗时操作) ---", 'Progress')
-            resort_result = self.organizer.resort_destination(dest_dir, progress_callback=self._update_progress_and_log)
+            if not self.organizer.uses_single_pass_numbering():
+                self.log("\n--- 开始重新整理目标目录以确保连续序号 (耗时操作) ---", 'Progress')
+                resort_result = self.organizer.resort_destination(dest_dir, progress_callback=self._update_progress_and_log)
 
-            if resort_result == "TERMINATED" or self.organizer.is_terminated:
-                self.log("\n--- 操作已终止 ---", 'Error')
-                self.organizer.rollback_operations(dest_dir) 
-                self.root.after(0, lambda: messagebox.showwarning("终止", "整理操作已终止并已回退更改。"))
-                return
+                if resort_result == "TERMINATED" or self.organizer.is_terminated:
+                    self.log("\n--- 操作已终止 ---", 'Error')
+                    self.organizer.rollback_operations(dest_dir) 
+                    self.root.after(0, lambda: messagebox.showwarning("终止", "整理操作已终止并已回退更改。"))
+                    return
 
             self.log("\n--- 整理全部完成 ---", 'Success')
             self.log(f"总计处理文件: {result['images_processed'] + result['videos_processed'] + result['documents_processed'] + result['other_processed']}", 'Success')
             self.log(f"删除了 {result['identical_files_removed']} 个完全相同的文件 (重复)", 'Success')
+            if result.get('identical_files_linked'):
+                self.log(f"链接了 {result['identical_files_linked']} 个完全相同的文件 (保留路径，共享存储)", 'Success')
             self.log("所有文件现已按日期顺序和序列号重命名", 'Success')
                 
             self.root.after(0, lambda: messagebox.showinfo("成功", "媒体文件整理操作完成!"))
@@ -682,6 +705,7 @@ class BatchFileOrganizerApp:
             self.log("[Info] 日志已经是空的", 'Info')
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = BatchFileOrganizerApp(root)
     root.mainloop()
\ No newline at end of file
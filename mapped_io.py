@@ -0,0 +1,89 @@
+# mapped_io.py
+import mmap
+import os
+
+from config import HASH_BUFFER_SIZE
+
+
+class MappedFile:
+    """只读内存映射文件：按偏移返回 memoryview 切片，不产生新的 bytes 对象
+    空文件或无法映射的文件（部分网络盘、特殊文件）自动回退到普通 seek/read
+    """
+
+    def __init__(self, file_path):
+        self._file = open(file_path, 'rb', buffering=0)
+        self._map = None
+        self._view = None
+        try:
+            self.size = os.fstat(self._file.fileno()).st_size
+            if self.size > 0:
+                try:
+                    self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._view = memoryview(self._map)
+                except (ValueError, OSError):
+                    self._map = None
+        except Exception:
+            self._file.close()
+            raise
+
+    @property
+    def is_mapped(self):
+        """是否成功建立了内存映射"""
+        return self._view is not None
+
+    def read(self, offset, length):
+        """读取 [offset, offset + length) 区间，超出文件末尾的部分被截断
+        映射模式下返回 memoryview 切片，回退模式下返回 bytes
+        """
+        offset = max(0, offset)
+        end = min(self.size, offset + max(0, length))
+        if self._view is not None:
+            return self._view[offset:end]
+        self._file.seek(offset)
+        return self._file.read(end - offset) if end > offset else b''
+
+    def iter_chunks(self, offset=0, length=None, chunk_size=None, buffer=None):
+        """按块遍历 [offset, offset + length) 区间，length 为 None 时读到文件末尾
+        回退模式下复用传入的 bytearray 做 readinto，产出的切片只在下一次迭代前有效
+        """
+        chunk_size = chunk_size or HASH_BUFFER_SIZE
+        offset = max(0, offset)
+        end = self.size if length is None else min(self.size, offset + max(0, length))
+
+        if self._view is not None:
+            for pos in range(offset, end, chunk_size):
+                yield self._view[pos:min(pos + chunk_size, end)]
+            return
+
+        if buffer is None:
+            buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        self._file.seek(offset)
+        remaining = None if length is None else end - offset
+        while remaining is None or remaining > 0:
+            count = self._file.readinto(view if remaining is None or remaining >= len(buffer) else view[:remaining])
+            if not count:
+                break
+            yield view[:count]
+            if remaining is not None:
+                remaining -= count
+
+    def close(self):
+        """释放映射和文件句柄；调用方仍持有切片时由垃圾回收在切片释放后解除映射"""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
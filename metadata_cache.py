@@ -0,0 +1,108 @@
+# metadata_cache.py
+import sqlite3
+import threading
+from datetime import datetime
+
+from config import DEFAULT_CACHE_BATCH_SIZE
+from file_operations import FileOperations
+
+
+# 这些来源的值直接以字符串保存，其余来源的值都是日期
+RAW_VALUE_SOURCES = ('phash',)
+
+
+class PersistentMetadataCache:
+    """基于 SQLite 的持久化元数据缓存，以 (路径, 大小, 修改时间, inode) 判断文件是否变化"""
+
+    def __init__(self, db_path, batch_size=None):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size or DEFAULT_CACHE_BATCH_SIZE)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_renames = []
+
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_dates ("
+            "path TEXT NOT NULL, source TEXT NOT NULL, size INTEGER, mtime_ns INTEGER, inode INTEGER, "
+            "value TEXT, PRIMARY KEY (path, source))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def file_signature(file_path):
+        """文件指纹：大小、纳秒修改时间和 inode"""
+        return FileOperations.get_file_signature(file_path)
+
+    def get(self, file_path, source):
+        """查询缓存，返回 (是否命中, 值)；文件已变化时视为未命中"""
+        try:
+            signature = PersistentMetadataCache.file_signature(file_path)
+        except OSError:
+            return False, None
+
+        with self._lock:
+            row = self._pending.get((file_path, source))
+            if row is None:
+                if self._pending_renames:
+                    self._flush_locked()
+                row = self._conn.execute(
+                    "SELECT path, source, size, mtime_ns, inode, value FROM file_dates WHERE path=? AND source=?",
+                    (file_path, source)
+                ).fetchone()
+
+        if row is None or tuple(row[2:5]) != signature:
+            return False, None
+        if source in RAW_VALUE_SOURCES:
+            return True, row[5]
+        return True, datetime.fromisoformat(row[5]) if row[5] else None
+
+    def put(self, file_path, source, value):
+        """写入缓存，按批次提交"""
+        try:
+            size, mtime_ns, inode = PersistentMetadataCache.file_signature(file_path)
+        except OSError:
+            return
+
+        if source not in RAW_VALUE_SOURCES:
+            value = value.isoformat() if value else None
+        with self._lock:
+            self._pending[(file_path, source)] = (file_path, source, size, mtime_ns, inode, value)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def rename(self, old_path, new_path):
+        """文件被移动后把缓存记录转到新路径"""
+        with self._lock:
+            for source in [key[1] for key in self._pending if key[0] == old_path]:
+                row = self._pending.pop((old_path, source))
+                self._pending[(new_path, source)] = (new_path,) + row[1:]
+            self._pending_renames.append((new_path, old_path))
+            if len(self._pending_renames) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        """提交所有待写入的记录"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        try:
+            if self._pending_renames:
+                self._conn.executemany("UPDATE OR REPLACE file_dates SET path=? WHERE path=?", self._pending_renames)
+                self._pending_renames = []
+            if self._pending:
+                self._conn.executemany("INSERT OR REPLACE INTO file_dates VALUES (?, ?, ?, ?, ?, ?)",
+                                       list(self._pending.values()))
+                self._pending = {}
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"写入元数据缓存失败: {str(e)}")
+
+    def close(self):
+        """提交剩余记录并关闭数据库"""
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
@@ -1,24 +1,58 @@
 # metadata_extractor.py
 import os
 from datetime import datetime
-from PIL import Image, ExifTags
-from PIL.ExifTags import TAGS
-import subprocess
-import json
+import struct
 from file_operations import FileOperations
-import re
-from dateutil import parser  
+from exif_reader import ExifDateReader
+from video_parser import BMFFDateReader
+from ffprobe_pool import FFprobePool
+from metadata_cache import PersistentMetadataCache
+from lru_cache import BoundedLRUCache
+from timestamp_parser import parse_timestamp
+from perceptual_hash import compute_dhash
+from config import METADATA_CACHE_MAX_ENTRIES
+
+
+IMAGE_METADATA_EXTENSIONS = ('.jpg', '.jpeg', '.tiff', '.tif', '.png', '.heic', '.dng', '.raw', '.cr2', '.nef', '.arw')
+VIDEO_METADATA_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv', '.m4v', '.mpeg', '.mpg', '.3gp', '.webm')
 
 
 class MetadataExtractor:
 
-    _metadata_cache = {}
+    _metadata_cache = BoundedLRUCache(METADATA_CACHE_MAX_ENTRIES)
+    _ffprobe_pool = FFprobePool()
+    _persistent_cache = None
     @staticmethod
     def get_image_metadata(file_path):
-        """从图片文件中提取元数据 - 增强格式兼容性"""
+        """从图片文件中提取元数据 - 优先只读文件头解析 EXIF，失败时回退到 Pillow"""
         cache_key = f"image_{file_path}"
-        if cache_key in MetadataExtractor._metadata_cache:
-            return MetadataExtractor._metadata_cache[cache_key]
+        hit, cached = MetadataExtractor._lookup_cached(cache_key, file_path, "exif")
+        if hit:
+            return cached
+
+        result = None
+        try:
+            parsed, date_str = ExifDateReader.read_date_string(file_path)
+        except (IOError, OSError, ValueError, struct.error):
+            parsed, date_str = False, None
+
+        if not parsed:
+            date_str = MetadataExtractor._read_exif_date_with_pillow(file_path)
+
+        if date_str:
+            result = MetadataExtractor._parse_image_date_string(date_str)
+
+        MetadataExtractor._store_cached(cache_key, file_path, "exif", result)
+        return result
+
+    @staticmethod
+    def _read_exif_date_with_pillow(file_path):
+        """使用 Pillow 读取完整 EXIF 中的日期字符串，仅在轻量解析失败时使用"""
+        try:
+            from PIL import Image
+            from PIL.ExifTags import TAGS
+        except ImportError:
+            return None
 
         try:
             with Image.open(file_path) as img:
@@ -29,118 +63,188 @@ class MetadataExtractor:
                         for tag, value in exif_data.items()
                     }
 
-                    date_str = (exif.get('DateTimeOriginal') or 
-                               exif.get('DateTime') or 
-                               exif.get('DateCreated') or
-                               exif.get('CreateDate'))
-                    
-                    if date_str:
-                        date_str = date_str.split('.')[0].strip()
-
-                        date_formats = [
-                            '%Y:%m:%d %H:%M:%S',    
-                            '%Y-%m-%d %H:%M:%S',    
-                            '%Y/%m/%d %H:%M:%S',    
-                            '%Y%m%d %H%M%S',        
-                            '%Y:%m:%d',           
-                            '%Y-%m-%d',          
-                            '%Y/%m/%d',          
-                            '%Y%m%d',              
-                        ]
-                        
-                        for date_format in date_formats:
-                            try:
-                                result = datetime.strptime(date_str, date_format)
-
-                                MetadataExtractor._metadata_cache[cache_key] = result
-                                return result
-                            except ValueError:
-                                continue
-
-                        try:
-                            result = parser.parse(date_str)
-                            MetadataExtractor._metadata_cache[cache_key] = result
-                            return result
-                        except (ValueError, TypeError):
-                            pass
+                    return (exif.get('DateTimeOriginal') or 
+                            exif.get('DateTime') or 
+                            exif.get('DateCreated') or
+                            exif.get('CreateDate'))
 
         except (IOError, OSError, Image.UnidentifiedImageError) as e:
             print(f"提取图片元数据失败 {file_path}: {str(e)}")
         except Exception as e:
             print(f"未知错误提取图片元数据 {file_path}: {str(e)}")
 
-        MetadataExtractor._metadata_cache[cache_key] = None
         return None
 
+    @staticmethod
+    def _parse_image_date_string(date_str):
+        """解析 EXIF 日期字符串，EXIF 记录的是拍摄地时间，带时区时保留字面时间"""
+        return parse_timestamp(date_str, to_local=False)
+
     @staticmethod
     def get_video_metadata(file_path):
-        """使用ffprobe从视频文件中提取元数据 - 增强时区处理"""
+        """从视频文件中提取元数据 - MP4/MOV 直接解析容器，其他格式回退到 ffprobe"""
         cache_key = f"video_{file_path}"
-        if cache_key in MetadataExtractor._metadata_cache:
-            return MetadataExtractor._metadata_cache[cache_key]
+        hit, cached = MetadataExtractor._lookup_cached(cache_key, file_path, "metadata")
+        if hit:
+            return cached
+
+        result = None
+        parsed = False
+        if BMFFDateReader.is_supported(file_path):
+            try:
+                parsed, result = BMFFDateReader.read_creation_time(file_path)
+            except (IOError, OSError, struct.error):
+                parsed, result = False, None
+
+        if not parsed or result is None:
+            result = MetadataExtractor._probe_video_with_ffprobe(file_path)
+
+        MetadataExtractor._store_cached(cache_key, file_path, "metadata", result)
+        return result
+
+    @staticmethod
+    def _probe_video_with_ffprobe(file_path):
+        """通过 ffprobe 执行池读取视频日期标签"""
+        tags = MetadataExtractor._ffprobe_pool.probe_tags(file_path)
+        return MetadataExtractor._date_from_ffprobe_tags(file_path, tags)
+
+    @staticmethod
+    def _date_from_ffprobe_tags(file_path, tags):
+        """从 ffprobe 标签中解析日期 - 增强时区处理"""
+        if not tags:
+            return None
+
+        date_str = (tags.get('creation_time') or 
+                   tags.get('date') or 
+                   tags.get('time') or
+                   tags.get('DATE'))
+
+        if not date_str:
+            return None
 
         try:
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', '-show_streams', file_path
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            if result.returncode == 0:
-                metadata = json.loads(result.stdout)
-
-                format_info = metadata.get('format', {})
-                tags = format_info.get('tags', {})
-
-                date_str = (tags.get('creation_time') or 
-                           tags.get('date') or 
-                           tags.get('time') or
-                           tags.get('DATE') or
-                           tags.get('creation_time'))
-
-                if date_str:
-                    if 'Z' in date_str or '+' in date_str:
-                        try:
-                            result = parser.parse(date_str)
-                            result = result.astimezone().replace(tzinfo=None)
-                            MetadataExtractor._metadata_cache[cache_key] = result
-                            return result
-                        except (ValueError, TypeError):
-                            date_str = re.sub(r'[Zz].*$', '', date_str)  
-                            date_str = re.sub(r'\+[0-9]{2}:[0-9]{2}$', '', date_str)  
-
-                    date_str = date_str.split('.')[0].replace('T', ' ').strip()
-                    
-                    date_formats = [
-                        '%Y-%m-%d %H:%M:%S',    
-                        '%Y%m%d %H%M%S',        
-                        '%Y-%m-%d',             
-                        '%Y/%m/%d %H:%M:%S',    
-                        '%Y:%m:%d %H:%M:%S',   
-                    ]
-                    
-                    for date_format in date_formats:
-                        try:
-                            result = datetime.strptime(date_str, date_format)
-                            MetadataExtractor._metadata_cache[cache_key] = result
-                            return result
-                        except ValueError:
-                            continue
-
-                    try:
-                        result = parser.parse(date_str)
-                        MetadataExtractor._metadata_cache[cache_key] = result
-                        return result
-                    except (ValueError, TypeError):
-                        pass
-
-        except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"提取视频元数据失败 {file_path}: {str(e)}")
+            return MetadataExtractor._parse_video_date_string(date_str)
         except Exception as e:
             print(f"未知错误提取视频元数据 {file_path}: {str(e)}")
+            return None
 
-        MetadataExtractor._metadata_cache[cache_key] = None
-        return None
+    @staticmethod
+    def pending_video_probes(file_paths, date_priority_list=None):
+        """找出需要 ffprobe 探测的视频：容器可直接解析的就地解析并写入缓存，已缓存的跳过
+        传入优先级列表时跳过不会用到视频元数据的文件
+        """
+        pending = []
+        for file_path in file_paths:
+            if not file_path.lower().endswith(VIDEO_METADATA_EXTENSIONS):
+                continue
+            if date_priority_list is not None and not MetadataExtractor.needs_video_metadata(file_path, date_priority_list):
+                continue
+            cache_key = f"video_{file_path}"
+            if MetadataExtractor._lookup_cached(cache_key, file_path, "metadata")[0]:
+                continue
+
+            if BMFFDateReader.is_supported(file_path):
+                try:
+                    parsed, result = BMFFDateReader.read_creation_time(file_path)
+                except (IOError, OSError, struct.error):
+                    parsed, result = False, None
+                if parsed and result is not None:
+                    MetadataExtractor._store_cached(cache_key, file_path, "metadata", result)
+                    continue
+
+            pending.append(file_path)
+        return pending
+
+    @staticmethod
+    def probe_videos(file_paths, progress_callback=None):
+        """交给 ffprobe 执行池并发探测视频日期，结果写入缓存
+        每完成一个文件调用 progress_callback(已完成数, 总数)，回调返回 True 时取消尚未开始的探测并返回 False
+        """
+        total = len(file_paths)
+        probes = MetadataExtractor._ffprobe_pool.probe_many(file_paths)
+        try:
+            for done, (file_path, tags) in enumerate(probes, 1):
+                MetadataExtractor._store_cached(f"video_{file_path}", file_path, "metadata",
+                                                MetadataExtractor._date_from_ffprobe_tags(file_path, tags))
+                if progress_callback and progress_callback(done, total):
+                    return False
+        finally:
+            probes.close()
+        return True
+
+    @staticmethod
+    def prefetch_video_metadata(file_paths, date_priority_list=None, progress_callback=None):
+        """批量预取视频日期：容器可直接解析的就地解析，其余交给 ffprobe 执行池并发探测，结果写入缓存
+        返回是否全部完成（progress_callback 的含义同 probe_videos）
+        """
+        pending = MetadataExtractor.pending_video_probes(file_paths, date_priority_list)
+        return MetadataExtractor.probe_videos(pending, progress_callback)
+
+    @staticmethod
+    def configure_ffprobe(max_workers=None, timeout=None, slots=None):
+        """设置 ffprobe 并发数和单文件超时；slots 为多个进程共享的并发信号量"""
+        old_pool = MetadataExtractor._ffprobe_pool
+        MetadataExtractor._ffprobe_pool = FFprobePool(max_workers, timeout, slots)
+        old_pool.shutdown()
+
+    @staticmethod
+    def _parse_video_date_string(date_str):
+        """解析视频元数据中的日期字符串，带时区的时间转换为本地时间"""
+        return parse_timestamp(date_str, to_local=True)
+
+    @staticmethod
+    def get_perceptual_hash(file_path):
+        """获取图片的感知哈希 (dHash)，结果以十六进制字符串写入元数据缓存，来源为 "phash"
+        无法计算时返回 None
+        """
+        cache_key = f"phash_{file_path}"
+        hit, cached = MetadataExtractor._lookup_cached(cache_key, file_path, "phash")
+        if not hit:
+            hash_value = compute_dhash(file_path)
+            cached = format(hash_value, 'x') if hash_value is not None else None
+            MetadataExtractor._store_cached(cache_key, file_path, "phash", cached)
+        return int(cached, 16) if cached else None
+
+    @staticmethod
+    def _lookup_cached(cache_key, file_path, source):
+        """依次查询内存缓存和持久化缓存，返回 (是否命中, 日期)"""
+        hit, result = MetadataExtractor._metadata_cache.lookup(cache_key)
+        if hit:
+            return True, result
+
+        if MetadataExtractor._persistent_cache is not None:
+            hit, result = MetadataExtractor._persistent_cache.get(file_path, source)
+            if hit:
+                MetadataExtractor._metadata_cache.put(cache_key, result)
+                return True, result
+
+        return False, None
+
+    @staticmethod
+    def _store_cached(cache_key, file_path, source, result):
+        """写入内存缓存，并同步到持久化缓存"""
+        MetadataExtractor._metadata_cache.put(cache_key, result)
+        if MetadataExtractor._persistent_cache is not None:
+            MetadataExtractor._persistent_cache.put(file_path, source, result)
+
+    @staticmethod
+    def set_persistent_cache(cache):
+        """设置持久化元数据缓存，传入 None 表示关闭"""
+        MetadataExtractor._persistent_cache = cache
+
+    @staticmethod
+    def close_persistent_cache():
+        """提交并关闭持久化元数据缓存"""
+        cache = MetadataExtractor._persistent_cache
+        MetadataExtractor._persistent_cache = None
+        if cache is not None:
+            cache.close()
+
+    @staticmethod
+    def record_file_moved(old_path, new_path):
+        """文件移动后同步持久化缓存中的路径"""
+        if MetadataExtractor._persistent_cache is not None:
+            MetadataExtractor._persistent_cache.rename(old_path, new_path)
 
     @staticmethod
     def clear_cache():
@@ -148,39 +252,122 @@ class MetadataExtractor:
         MetadataExtractor._metadata_cache.clear()
 
     @staticmethod
-    def get_file_date(file_path, date_priority_list):
-        """使用多种方法从文件获取日期，支持优先级列表 - 增强兼容性"""
-        cache_key = f"date_{file_path}_{'_'.join(date_priority_list)}"
-        if cache_key in MetadataExtractor._metadata_cache:
-            return MetadataExtractor._metadata_cache[cache_key]
+    def configure_cache(max_entries):
+        """设置内存元数据缓存的最大条目数"""
+        MetadataExtractor._metadata_cache.resize(max_entries)
+
+    @staticmethod
+    def get_cache_stats():
+        """返回内存元数据缓存的命中/未命中/淘汰统计"""
+        return MetadataExtractor._metadata_cache.stats()
+
+    @staticmethod
+    def _date_sources(file_path):
+        """按来源名称返回延迟求值的日期获取函数；修改时间取扫描缓存，创建/访问时间共享同一次 stat 结果"""
+        lower_path = file_path.lower()
+        stat_holder = []
+
+        def stat_time(attribute, label):
+            def getter():
+                try:
+                    if attribute == 'st_mtime':
+                        return datetime.fromtimestamp(FileOperations.get_file_mtime(file_path))
+                    if not stat_holder:
+                        stat_holder.append(FileOperations.get_file_stat(file_path))
+                    return datetime.fromtimestamp(getattr(stat_holder[0], attribute))
+                except (OSError, ValueError, OverflowError) as e:
+                    print(f"获取文件{label}失败 {file_path}: {str(e)}")
+                    return datetime(1900, 1, 1)
+            return getter
 
         date_sources = {}
+        if lower_path.endswith(IMAGE_METADATA_EXTENSIONS):
+            date_sources["exif"] = lambda: MetadataExtractor.get_image_metadata(file_path)
+        elif lower_path.endswith(VIDEO_METADATA_EXTENSIONS):
+            date_sources["metadata"] = lambda: MetadataExtractor.get_video_metadata(file_path)
 
-        if file_path.lower().endswith(
-                ('.jpg', '.jpeg', '.tiff', '.tif', '.png', '.heic', '.dng', '.raw', '.cr2', '.nef', '.arw')):
-            date_sources["exif"] = MetadataExtractor.get_image_metadata(file_path)
+        date_sources["filename"] = lambda: FileOperations.extract_date_from_filename(os.path.basename(file_path))
+        date_sources["filetime"] = stat_time('st_mtime', '修改时间')
+        date_sources["creationtime"] = stat_time('st_ctime', '创建时间')
+        date_sources["filesystem"] = stat_time('st_atime', '系统元数据时间')
+        return date_sources
 
-        elif file_path.lower().endswith(
-                ('.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv', '.m4v', '.mpeg', '.mpg', '.3gp', '.webm')):
-            date_sources["metadata"] = MetadataExtractor.get_video_metadata(file_path)
+    @staticmethod
+    def needs_video_metadata(file_path, date_priority_list):
+        """判断按优先级求值时是否会用到视频元数据（排在前面的廉价来源已给出有效日期则不需要）"""
+        date_sources = MetadataExtractor._date_sources(file_path)
+        if "metadata" not in date_sources:
+            return False
 
-        filename = os.path.basename(file_path)
-        date_sources["filename"] = FileOperations.extract_date_from_filename(filename)
+        for source in date_priority_list:
+            if source == "metadata":
+                return True
+            getter = date_sources.get(source)
+            if getter is not None:
+                date = getter()
+                if date and date.year > 1970:
+                    return False
+        return False
 
-        date_sources["filetime"] = FileOperations.get_file_modification_time(file_path)
+    @staticmethod
+    def get_file_date(file_path, date_priority_list):
+        """使用多种方法从文件获取日期，支持优先级列表 - 增强兼容性"""
+        return MetadataExtractor.get_file_date_with_source(file_path, date_priority_list)[0]
 
-        date_sources["creationtime"] = FileOperations.get_file_creation_time(file_path)
+    @staticmethod
+    def get_file_date_with_source(file_path, date_priority_list):
+        """获取文件日期及其来源，返回 (日期, 来源)"""
+        cache_key = f"date_{file_path}_{'_'.join(date_priority_list)}"
+        hit, cached = MetadataExtractor._metadata_cache.lookup(cache_key)
+        if hit:
+            return cached
 
-        date_sources["filesystem"] = FileOperations.get_file_system_metadata_time(file_path)
+        date_sources = MetadataExtractor._date_sources(file_path)
+        evaluated = {}
 
-        result_date = None
+        result = None
         for source in date_priority_list:
-            if source in date_sources and date_sources[source] and date_sources[source].year > 1970:
-                result_date = date_sources[source]
+            getter = date_sources.get(source)
+            if getter is None:
+                continue
+            date = evaluated[source] = getter()
+            if date and date.year > 1970:
+                result = (date, source)
                 break
 
-        if not result_date:
-            result_date = date_sources["filetime"]
+        if not result:
+            date = evaluated["filetime"] if "filetime" in evaluated else date_sources["filetime"]()
+            result = (date, "filetime")
+
+        MetadataExtractor._metadata_cache.put(cache_key, result)
+        return result
+
+
+def init_date_worker(ffprobe_workers=None, ffprobe_timeout=None, ffprobe_slots=None):
+    """进程池初始化函数：子进程沿用主进程的 ffprobe 超时设置，并通过共享信号量让所有子进程合计不超过设定的并发数"""
+    MetadataExtractor.configure_ffprobe(ffprobe_workers, ffprobe_timeout, ffprobe_slots)
+
+
+def extract_dates_batch(file_paths, date_priority_list, cache_path=None):
+    """进程池工作函数：批量提取日期，返回紧凑的 (路径, 时间戳, 来源) 列表，无有效日期时时间戳为 None"""
+    if cache_path and MetadataExtractor._persistent_cache is None:
+        try:
+            MetadataExtractor.set_persistent_cache(PersistentMetadataCache(cache_path))
+        except Exception as e:
+            print(f"打开元数据缓存失败 {cache_path}: {str(e)}")
+
+    MetadataExtractor.prefetch_video_metadata(file_paths, date_priority_list)
+
+    results = []
+    for file_path in file_paths:
+        try:
+            date, source = MetadataExtractor.get_file_date_with_source(file_path, date_priority_list)
+            timestamp = date.timestamp() if date and date.year > 1970 else None
+        except Exception as e:
+            print(f"提取文件日期失败 {file_path}: {str(e)}")
+            timestamp, source = None, None
+        results.append((file_path, timestamp, source))
 
-        MetadataExtractor._metadata_cache[cache_key] = result_date
-        return result_date
\ No newline at end of file
+    if MetadataExtractor._persistent_cache is not None:
+        MetadataExtractor._persistent_cache.flush()
+    return results
@@ -0,0 +1,174 @@
+# move_engine.py
+import errno
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DEFAULT_COPY_WORKERS, COPY_CHUNK_SIZE
+
+
+def _copy_range(src_fd, dst_fd, size, chunk_size):
+    """在两个文件描述符之间复制 size 字节，依次尝试 copy_file_range（内核内复制，支持时可走 reflink/服务端复制）、
+    sendfile、普通 read/write；前两种方式在一个字节都还没复制时失败或返回 0（部分 FUSE/网络文件系统不支持）才会降级
+    """
+    copied = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while copied < size:
+                count = os.copy_file_range(src_fd, dst_fd, min(chunk_size, size - copied))
+                if not count:
+                    break
+                copied += count
+            if copied or not size:
+                return copied
+        except OSError:
+            if copied:
+                raise
+
+    if hasattr(os, 'sendfile'):
+        try:
+            while copied < size:
+                count = os.sendfile(dst_fd, src_fd, copied, min(chunk_size, size - copied))
+                if not count:
+                    break
+                copied += count
+            if copied or not size:
+                return copied
+        except OSError:
+            if copied:
+                raise
+
+    os.lseek(src_fd, copied, os.SEEK_SET)
+    os.lseek(dst_fd, copied, os.SEEK_SET)
+    while copied < size:
+        data = os.read(src_fd, min(chunk_size, size - copied))
+        if not data:
+            break
+        view = memoryview(data)
+        while view:
+            written = os.write(dst_fd, view)
+            view = view[written:]
+        copied += len(data)
+    return copied
+
+
+def copy_and_unlink(src, dst, chunk_size=None):
+    """跨设备移动单个文件：先复制到目标目录中的临时文件并 fsync，校验大小一致后再改名为目标名并删除源文件
+    返回复制的字节数；校验失败时删除临时文件并抛出 OSError，源文件保持不动
+    """
+    chunk_size = chunk_size or COPY_CHUNK_SIZE
+    directory, name = os.path.split(dst)
+    temp_path = os.path.join(directory, f".{name}.part")
+
+    src_fd = os.open(src, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        size = os.fstat(src_fd).st_size
+        dst_fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            copied = _copy_range(src_fd, dst_fd, size, chunk_size)
+            os.fsync(dst_fd)
+            written = os.fstat(dst_fd).st_size
+        finally:
+            os.close(dst_fd)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        os.close(src_fd)
+
+    if copied != size or written != size:
+        os.remove(temp_path)
+        raise OSError(errno.EIO, f"复制后大小不一致 ({written}/{size})", src)
+
+    try:
+        shutil.copystat(src, temp_path)
+        os.replace(temp_path, dst)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.unlink(src)
+    return size
+
+
+class MoveEngine:
+    """文件移动引擎：每个文件先直接 os.rename（同设备只改目录项），系统返回 EXDEV 时才视为跨设备，
+    交给复制线程池，用 copy_file_range/sendfile 复制、校验大小后删除源文件，并统计复制吞吐量
+    不预先比较 st_dev：Windows 上扫描缓存的 st_dev 恒为 0，而改名失败本身就是最准确的跨设备判断
+    """
+
+    def __init__(self, copy_workers=None, chunk_size=None):
+        self.copy_workers = max(1, copy_workers or DEFAULT_COPY_WORKERS)
+        self.chunk_size = chunk_size or COPY_CHUNK_SIZE
+        self.files_renamed = 0
+        self.files_copied = 0
+        self.bytes_copied = 0
+        self._copy_started = None
+        self._copy_finished = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def rename(self, src, dst):
+        """尝试同设备改名（目标目录需已存在）；成功返回 True，跨设备 (EXDEV) 返回 False，其他错误照常抛出"""
+        try:
+            os.rename(src, dst)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            return False
+        with self._lock:
+            self.files_renamed += 1
+        return True
+
+    def move(self, src, dst):
+        """同步移动一个文件（目标目录需已存在），返回复制的字节数（同设备改名时为 0）"""
+        if self.rename(src, dst):
+            return 0
+        return self._copy(src, dst)
+
+    def _copy(self, src, dst):
+        if os.path.islink(src):
+            shutil.move(src, dst)
+            return 0
+
+        start = time.perf_counter()
+        size = copy_and_unlink(src, dst, self.chunk_size)
+        end = time.perf_counter()
+        with self._lock:
+            self.files_copied += 1
+            self.bytes_copied += size
+            if self._copy_started is None or start < self._copy_started:
+                self._copy_started = start
+            if self._copy_finished is None or end > self._copy_finished:
+                self._copy_finished = end
+        return size
+
+    def submit(self, src, dst):
+        """提交一个跨设备移动到复制线程池（目标目录需已存在），返回 Future；调用方先用 rename 确认不能直接改名"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.copy_workers)
+        return self._executor.submit(self._copy, src, dst)
+
+    def throughput(self):
+        """跨设备复制的吞吐量（字节/秒），按第一个复制开始到最后一个复制结束的墙钟时间计算"""
+        if not self.bytes_copied:
+            return 0.0
+        elapsed = self._copy_finished - self._copy_started
+        return self.bytes_copied / elapsed if elapsed > 0 else 0.0
+
+    def close(self):
+        """等待所有复制任务完成并关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_default_engine = MoveEngine(copy_workers=1)
+
+
+def move_file(src, dst):
+    """同步移动单个文件（目标目录需已存在）：同设备 rename，跨设备复制校验后删除源文件"""
+    return _default_engine.move(src, dst)
@@ -0,0 +1,142 @@
+# move_journal.py
+import json
+import os
+import threading
+import time
+
+from config import JOURNAL_FILE_NAME, JOURNAL_FSYNC_INTERVAL
+
+
+class MoveJournal:
+    """只追加的移动日志 (JSON Lines)，写在目标目录中，进程崩溃或断电后仍可恢复
+    执行前整批写入计划并立即 fsync（预写）；执行过程中的完成记录按间隔批量 fsync，
+    崩溃时丢失的少量完成记录在恢复阶段根据文件实际位置补齐
+    """
+
+    def __init__(self, file_path, fsync_interval=None):
+        self.file_path = file_path
+        self.fsync_interval = max(1, fsync_interval or JOURNAL_FSYNC_INTERVAL)
+        self._file = None
+        self._unsynced = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path_for(dest_dir):
+        """目标目录对应的日志文件路径"""
+        return os.path.join(dest_dir, JOURNAL_FILE_NAME)
+
+    def open(self, source_dir, dest_dir):
+        """开始一次运行：追加 begin 记录并立即落盘"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+        self._file = open(self.file_path, 'a', encoding='utf-8')
+        self._append({'op': 'begin', 'source': os.path.abspath(source_dir),
+                      'dest': os.path.abspath(dest_dir), 'time': time.time()})
+        self.sync()
+
+    @property
+    def is_open(self):
+        return self._file is not None
+
+    def _append(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_interval:
+                self._sync_locked()
+
+    def _sync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def sync(self):
+        """把缓冲区中的记录写入磁盘"""
+        with self._lock:
+            if self._file is not None:
+                self._sync_locked()
+
+    def record_plan(self, moves):
+        """预写一批计划移动 [(源路径, 目标路径)]，全部写完后 fsync 一次"""
+        for source, destination in moves:
+            self._append({'op': 'plan', 'src': source, 'dst': destination})
+        self.sync()
+
+    def record_done(self, operation, source, destination):
+        """记录一个已完成的操作（move 或 link），按间隔批量 fsync"""
+        self._append({'op': operation, 'src': source, 'dst': destination})
+
+    def close(self):
+        """落盘并关闭，日志文件保留以便下次启动时恢复"""
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._sync_locked()
+                finally:
+                    self._file.close()
+                    self._file = None
+
+    def complete(self):
+        """运行正常结束（或已完整回退）：关闭并删除日志"""
+        self.close()
+        try:
+            os.remove(self.file_path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def load(file_path):
+        """读取日志，返回 JournalState；文件不存在时返回 None，最后一行写了一半时忽略该行"""
+        if not os.path.exists(file_path):
+            return None
+
+        state = JournalState(file_path)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                operation = record.get('op')
+                if operation == 'begin':
+                    state.source_dir = record.get('source')
+                    state.dest_dir = record.get('dest')
+                elif operation == 'plan':
+                    state.planned.append((record['src'], record['dst']))
+                elif operation in ('move', 'link'):
+                    state.completed.append((operation, record['src'], record['dst']))
+        return state
+
+
+class JournalState:
+    """一次未完成运行的日志内容"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.source_dir = None
+        self.dest_dir = None
+        self.planned = []
+        self.completed = []
+
+    def completed_operations(self):
+        """已完成的操作（按执行顺序）：显式完成记录，加上未来得及落盘但文件已在目标位置的计划移动
+        未记录的计划从后往前判断：目标已存在，且源已不存在或源名称已被后面某个已完成的移动占用，即视为已完成
+        """
+        recorded = {source: destination for operation, source, destination in self.completed if operation == 'move'}
+        filled_later = set()
+        inferred = []
+        for source, destination in reversed(self.planned):
+            if source in recorded:
+                filled_later.add(recorded[source])
+                continue
+            if source == destination or not os.path.exists(destination):
+                continue
+            if not os.path.exists(source) or source in filled_later:
+                inferred.append(('move', source, destination))
+                filled_later.add(destination)
+        return list(self.completed) + inferred[::-1]
+
+    def pending_moves(self):
+        """尚未执行的计划移动：源文件仍在原处"""
+        done = {source for _, source, _ in self.completed_operations()}
+        return [(source, destination) for source, destination in self.planned
+                if source not in done and source != destination and os.path.exists(source)]
@@ -0,0 +1,140 @@
+# naming_engine.py
+import re
+import time
+from datetime import datetime
+
+
+class NameFormatter:
+    """文件命名格式化器：每次运行按 file_naming_mode、naming_pattern、sequence_wrapper、file_separator 编译一次，
+    之后每个文件只做字段拼接。序号宽度按总数缓存，分隔符清理正则预先编译，
+    模板中不含空白时跳过空白合并
+    """
+
+    def __init__(self, file_naming_mode="default", naming_pattern="{date}{separator}{sequence}",
+                 sequence_wrapper="[]", file_separator=""):
+        self.custom = file_naming_mode != "default"
+        self.naming_pattern = naming_pattern
+
+        if sequence_wrapper and len(sequence_wrapper) >= 2:
+            self._prefix, self._suffix = sequence_wrapper[0], sequence_wrapper[-1]
+        else:
+            self._prefix = self._suffix = ""
+
+        self.separator = file_separator if file_separator != "无" else " "
+        self._widths = {}
+
+        static_text = naming_pattern + self.separator + self._prefix + self._suffix
+        self._collapse = re.compile(r'\s+') if re.search(r'\s', static_text) else None
+        if self.separator:
+            separator_class = re.escape(self.separator)
+            self._edges = re.compile(f'(^[{separator_class}\\s]+)|([{separator_class}\\s]+$)')
+        else:
+            self._edges = None
+
+    def sequence_text(self, sequence_number, total_count):
+        """序号文本：总数不足 100 时补足两位，否则三位，与 FileOrganizer.get_sequence_format 一致"""
+        width = self._widths.get(total_count)
+        if width is None:
+            width = 2 if total_count < 100 else 3
+            self._widths[total_count] = width
+        return str(sequence_number).zfill(width)
+
+    def wrap(self, sequence_text):
+        """给序号加上外层符号"""
+        return self._prefix + sequence_text + self._suffix
+
+    def __call__(self, date, date_key, sequence_number, total_count):
+        """生成不含扩展名的文件名，返回 (文件名, 带外层符号的序号)；sequence_number 从 1 开始
+        自定义模板格式化失败时抛出原始异常，由调用方回退到默认命名
+        """
+        sequence_number_raw = self.sequence_text(sequence_number, total_count)
+        wrapped_sequence = self._prefix + sequence_number_raw + self._suffix
+
+        if not self.custom:
+            if date_key == "N":
+                date_part = "未知日期"
+            elif hasattr(date, 'strftime'):
+                date_part = f"{date.year:04d}-{date.month:02d}-{date.day:02d}"
+            elif len(date_key) == 4:
+                date_part = f"{date_key}-01-01"
+            elif len(date_key) == 7:
+                date_part = f"{date_key}-01"
+            else:
+                date_part = date_key
+            return f"{date_part} {wrapped_sequence}", wrapped_sequence
+
+        if date_key != "N":
+            year_part, month_part, day_part = f"{date.year:04d}", f"{date.month:02d}", f"{date.day:02d}"
+        else:
+            year_part = month_part = day_part = ""
+
+        base_name = self.naming_pattern.format(
+            date=date_key,
+            sequence=sequence_number_raw,
+            wrapped_sequence=wrapped_sequence,
+            year=year_part,
+            month=month_part,
+            day=day_part,
+            separator=self.separator
+        ).strip()
+
+        if self._collapse is not None:
+            base_name = self._collapse.sub(' ', base_name)
+        if self._edges is not None:
+            base_name = self._edges.sub('', base_name)
+
+        if not base_name and wrapped_sequence:
+            base_name = wrapped_sequence
+        return base_name, wrapped_sequence
+
+
+def benchmark(count=1000000, repeat=3):
+    """对比原先逐个文件现场格式化的实现与编译后格式化器的吞吐量（文件名/秒）"""
+    naming_pattern = "{year}-{month}-{day}-[{sequence}]"
+    sequence_wrapper = "[]"
+    file_separator = "-"
+
+    def legacy_name(date, date_key, current_sequence, total_seq_count):
+        seq_format = "{:02d}" if total_seq_count < 100 else "{:03d}"
+        sequence_number_raw = seq_format.format(current_sequence + 1)
+        wrapped_sequence = f"{sequence_wrapper[0]}{sequence_number_raw}{sequence_wrapper[-1]}"
+        temp_name = naming_pattern.format(
+            date=date_key,
+            sequence=sequence_number_raw,
+            wrapped_sequence=wrapped_sequence,
+            year=date.strftime("%Y"),
+            month=date.strftime("%m"),
+            day=date.strftime("%d"),
+            separator=file_separator
+        )
+        base_name = re.sub(r'\s+', ' ', temp_name.strip())
+        custom_sep_pattern = re.escape(file_separator)
+        base_name = re.sub(f'(^[{custom_sep_pattern}\\s]+)|([{custom_sep_pattern}\\s]+$)', '', base_name)
+        return base_name, wrapped_sequence
+
+    dates = [datetime(2020 + i % 5, 1 + i % 12, 1 + i % 28) for i in range(1000)]
+    items = [(dates[i % 1000], f"{2020 + i % 5}", i % 500, 500) for i in range(count)]
+    formatter = NameFormatter("custom", naming_pattern, sequence_wrapper, file_separator)
+
+    assert all(legacy_name(*item) == formatter(item[0], item[1], item[2] + 1, item[3]) for item in items[:5000])
+
+    def measure(func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return count / best
+
+    results = {
+        'legacy': measure(lambda: [legacy_name(*item) for item in items]),
+        'compiled': measure(lambda: [formatter(date, date_key, sequence + 1, total) for date, date_key, sequence, total in items]),
+    }
+    for name, rate in results.items():
+        print(f"{name:>8}: {rate:,.0f} 文件名/秒 ({rate / results['legacy']:.1f}x)")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -2,7 +2,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import re
+from datetime import datetime
 from base_dialog import BaseDialog
+from naming_engine import NameFormatter
 
 class NamingRulesDialog(BaseDialog):
     def __init__(self, parent, organizer):
@@ -286,6 +288,28 @@ class NamingRulesDialog(BaseDialog):
         
         self.update_preview()
     
+    def build_file_pattern(self):
+        """根据当前选择的日期组件、分隔符和序号外层符号生成自定义文件命名模板"""
+        components = []
+        separator = self.file_separator_var.get()
+
+        if self.file_year_var.get():
+            components.append("{year}年" if separator == "年月日" else "{year}")
+        if self.file_month_var.get():
+            components.append("{month}月" if separator == "年月日" else "{month}")
+        if self.file_day_var.get():
+            components.append("{day}日" if separator == "年月日" else "{day}")
+
+        wrapper = self.wrapper_var.get()
+        if wrapper == "无":
+            components.append("{sequence}")
+        else:
+            components.append(wrapper[0] + "{sequence}" + wrapper[1])
+
+        if separator == "年月日":
+            return "".join(components)
+        return separator.join(components)
+
     def sanitize_filename(self, name):
         """清理文件名中的非法字符"""
         illegal_chars = r'[<>:"/\\|?*\x00-\x1f]'
@@ -316,60 +340,18 @@ class NamingRulesDialog(BaseDialog):
                 folder_preview = f"{custom_name}{separator}{sequence}"
                 folder_preview = self.sanitize_filename(folder_preview)
 
+            wrapper = self.wrapper_var.get()
+            sequence_wrapper = "" if wrapper == "无" else wrapper
+            sample_date = datetime(2024, 3, 15)
+            sample_key = {"daily": "2024-03-15", "monthly": "2024-03"}.get(self.mode_var.get(), "2024")
             if self.file_mode_var.get() == "default":
-                date_part = "2024-03-15" 
-                wrapper = self.wrapper_var.get()
-                if wrapper == "无":
-                    sequence = "001"
-                elif wrapper and len(wrapper) >= 2:
-                    sequence = f"{wrapper[0]}001{wrapper[1]}"
-                else:
-                    sequence = "001"
-
-                file_preview = f"{date_part} {sequence}.jpg"
+                formatter = NameFormatter("default", sequence_wrapper=sequence_wrapper)
+                file_preview = formatter(sample_date, sample_key, 1, 100)[0] + ".jpg"
             else:
-                year_part = "2024"
-                month_part = "03"
-                day_part = "15"
-
-                components = []
-                separator = self.file_separator_var.get()
-                
-                if self.file_year_var.get():
-                    if separator == "年月日":
-                        components.append(f"{year_part}年")
-                    else:
-                        components.append(f"{year_part}")
-                        
-                if self.file_month_var.get():
-                    if separator == "年月日":
-                        components.append(f"{month_part}月")
-                    else:
-                        components.append(f"{month_part}")
-                        
-                if self.file_day_var.get():
-                    if separator == "年月日":
-                        components.append(f"{day_part}日")
-                    else:
-                        components.append(f"{day_part}")
-
-                wrapper = self.wrapper_var.get()
-                if wrapper == "无":
-                    components.append("001")
-                elif wrapper and len(wrapper) >= 2:
-                    components.append(f"{wrapper[0]}001{wrapper[1]}")
-                else:
-                    components.append("001")
-                
-                if components:
-                    if separator == "年月日":
-                        file_preview = "".join(components) + ".jpg"
-                    else:
-                        file_preview = separator.join(components) + ".jpg"
-                else:
-                    file_preview = "请选择文件命名组件"
-
-                file_preview = self.sanitize_filename(file_preview)
+                selected_separator = self.file_separator_var.get()
+                file_separator = "" if selected_separator == "年月日" else selected_separator
+                formatter = NameFormatter("custom", self.build_file_pattern(), sequence_wrapper, file_separator)
+                file_preview = self.sanitize_filename(formatter(sample_date, sample_key, 1, 100)[0] + ".jpg")
             
             preview = f"文件夹: {folder_preview} | 文件: {file_preview}"
             self.preview_var.set(preview)
@@ -400,39 +382,7 @@ class NamingRulesDialog(BaseDialog):
 
         self.organizer.set_file_naming_mode(self.file_mode_var.get())
         if self.file_mode_var.get() == "custom":
-            components = []
-            separator = self.file_separator_var.get()
-            
-            if self.file_year_var.get():
-                if separator == "年月日":
-                    components.append("{year}年")
-                else:
-                    components.append("{year}")
-                    
-            if self.file_month_var.get():
-                if separator == "年月日":
-                    components.append("{month}月")
-                else:
-                    components.append("{month}")
-                    
-            if self.file_day_var.get():
-                if separator == "年月日":
-                    components.append("{day}日")
-                else:
-                    components.append("{day}")
-
-            wrapper = self.wrapper_var.get()
-            if wrapper == "无":
-                components.append("{sequence}")
-            else:
-                components.append(wrapper[0] + "{sequence}" + wrapper[1])
-            
-            if components:
-                if separator == "年月日":
-                    pattern = "".join(components)
-                else:
-                    pattern = separator.join(components)
-                self.organizer.set_naming_pattern(pattern)
+            self.organizer.set_naming_pattern(self.build_file_pattern())
 
         wrapper = self.wrapper_var.get()
         if wrapper == "无":
@@ -1,19 +1,40 @@
 # organizer_core.py
 import os
-from collections import defaultdict
+from collections import defaultdict, deque
 from datetime import datetime
 from pathlib import Path
 import time
 import shutil
 import json
 import threading
+import multiprocessing
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from config import (DEFAULT_IMAGE_FORMATS, DEFAULT_VIDEO_FORMATS, DEFAULT_DOCUMENT_FORMATS,
-                    MAX_FILES_PER_FOLDER, BACKUP_FOLDER_NAME,
-                    DEFAULT_OTHER_FILES_FOLDER, DEFAULT_NO_DATE_FOLDER, SETTINGS_FILE)
+                    MAX_FILES_PER_FOLDER,
+                    DEFAULT_OTHER_FILES_FOLDER, DEFAULT_NO_DATE_FOLDER, SETTINGS_FILE, METADATA_CACHE_FILE,
+                    METADATA_CACHE_MAX_ENTRIES,
+                    DEFAULT_SCAN_WORKERS, DEFAULT_METADATA_WORKERS, DEFAULT_PIPELINE_QUEUE_SIZE,
+                    DEFAULT_DATE_WORKERS, DEFAULT_DATE_CHUNK_SIZE,
+                    DEFAULT_FFPROBE_WORKERS, DEFAULT_FFPROBE_TIMEOUT,
+                    DEFAULT_HASH_ALGORITHM, DEFAULT_HASH_WORKERS,
+                    SAMPLING_PREFILTER_THRESHOLD, DEDUP_COMPARE_THRESHOLD,
+                    DEFAULT_NEAR_DUPLICATE_THRESHOLD, DEDUP_ACTIONS, RENAME_PLAN_FILE_NAME,
+                    JOURNAL_FSYNC_INTERVAL, DEFAULT_ROLLBACK_WORKERS, DEFAULT_COPY_WORKERS)
 from file_operations import FileOperations
-from metadata_extractor import MetadataExtractor
+from metadata_extractor import MetadataExtractor, extract_dates_batch, init_date_worker
+from metadata_cache import PersistentMetadataCache
+from scanner import DirectoryScanner, ParallelDirectoryWalker
+from pipeline import ScanExtractPipeline
+from dedup import DuplicateDetector
+from hashing import HASH_ALGORITHMS, HashingPool
+from perceptual_hash import group_near_duplicates
+from rename_planner import RenamePlanner
+from move_journal import MoveJournal
+from rollback_engine import RollbackEngine
+from move_engine import MoveEngine
+from naming_engine import NameFormatter
 
 
 class FileOrganizer:
@@ -24,6 +45,8 @@ class FileOrganizer:
         self.document_formats = set(DEFAULT_DOCUMENT_FORMATS)
         self.other_formats = set()
         self.duplicate_handling = "resort"  
+        self.dedup_action = "delete"
+        self.identical_files_linked = 0
         self.identical_files_removed = 0 
         self.naming_pattern = "{date}{separator}{sequence}"  
         self.folder_naming_pattern = "{year}-{index}"  
@@ -40,6 +63,34 @@ class FileOrganizer:
         self.max_files_per_folder = MAX_FILES_PER_FOLDER  
         self.folder_separator = "-"  
         self.file_separator = ""  
+        self.scan_workers = DEFAULT_SCAN_WORKERS
+        self.pipeline_mode = False
+        self.metadata_workers = DEFAULT_METADATA_WORKERS
+        self.pipeline_queue_size = DEFAULT_PIPELINE_QUEUE_SIZE
+        self.date_extraction_mode = "serial"
+        self.date_workers = DEFAULT_DATE_WORKERS
+        self.date_chunk_size = DEFAULT_DATE_CHUNK_SIZE
+        self.ffprobe_workers = DEFAULT_FFPROBE_WORKERS
+        self.ffprobe_timeout = DEFAULT_FFPROBE_TIMEOUT
+        self.use_persistent_cache = True
+        self.metadata_cache_entries = METADATA_CACHE_MAX_ENTRIES
+        self.detect_duplicates = True
+        self.hash_algorithm = DEFAULT_HASH_ALGORITHM
+        self.hash_workers = DEFAULT_HASH_WORKERS
+        self.sampling_threshold = SAMPLING_PREFILTER_THRESHOLD
+        self.dedup_compare_threshold = DEDUP_COMPARE_THRESHOLD
+        self.detect_near_duplicates = False
+        self.near_duplicate_threshold = DEFAULT_NEAR_DUPLICATE_THRESHOLD
+        self.export_rename_plan = False
+        self.single_pass_numbering = False
+        self.use_move_journal = True
+        self.journal_fsync_interval = JOURNAL_FSYNC_INTERVAL
+        self.journal = None
+        self.rollback_workers = DEFAULT_ROLLBACK_WORKERS
+        self.copy_workers = DEFAULT_COPY_WORKERS
+        self.touched_directories = set()
+        self.duplicate_map = {}
+        self.near_duplicate_groups = []
         self.is_paused = False
         self.is_terminated = False
         self.rollback_log = []  
@@ -158,6 +209,14 @@ class FileOrganizer:
         if total_files == 0:
             return
 
+        planner = RenamePlanner()
+        name_formatter = NameFormatter(self.file_naming_mode, self.naming_pattern, self.sequence_wrapper, self.file_separator)
+
+        sequence_plans = {}
+        if self.uses_single_pass_numbering(is_resort):
+            sequence_plans = self._plan_existing_renumbering(dated_files, folder_structure, planner, name_formatter)
+            total_files += len(planner.entries)
+
         unknown_folder = os.path.join(dest_dir, self.no_date_files_folder)
         other_folder = os.path.join(dest_dir, self.other_files_folder)
 
@@ -208,132 +267,244 @@ class FileOrganizer:
                         sequence_counters[date_key][file_type] += 1
 
                     total_seq_count = date_key_counts[date_key][file_type] if self.folder_naming_mode != "custom" and date_key in date_key_counts else total_files
-                    
-                    seq_format = FileOrganizer.get_sequence_format(total_seq_count)
-                    sequence_number_raw = seq_format.format(current_sequence + 1)
 
-                    if self.sequence_wrapper and len(self.sequence_wrapper) >= 2:
-                        wrapped_sequence = f"{self.sequence_wrapper[0]}{sequence_number_raw}{self.sequence_wrapper[-1]}"
-                    else:
-                        wrapped_sequence = sequence_number_raw
-                        
+                    if (date_key, file_type) in sequence_plans:
+                        total_seq_count, merged_sequences = sequence_plans[(date_key, file_type)]
+                        current_sequence = merged_sequences[i] - 1
                     
                     if date_key == "N" and not self.rename_no_date_files:
+                        wrapped_sequence = name_formatter.wrap(name_formatter.sequence_text(current_sequence + 1, total_seq_count))
                         base_name = Path(file_path).stem
                     else:
-                        if self.file_naming_mode == "default":
-                            if date_key == "N":
-                                date_part = "未知日期"
-                            else:
-                                if hasattr(date, 'strftime'):
-                                    date_part = date.strftime("%Y-%m-%d")
-                                else:
-                                    try:
-                                        if len(date_key) == 4:  
-                                            date_part = f"{date_key}-01-01"
-                                        elif len(date_key) == 7:  
-                                            date_part = f"{date_key}-01"
-                                        else:  
-                                            date_part = date_key
-                                    except:
-                                        date_part = date_key
-
-                            base_name = f"{date_part} {wrapped_sequence}"
-
-                        else:
-                            try:
-                                year_part = ""
-                                month_part = ""
-                                day_part = ""
-
-                                if date_key != "N":
-                                    year_part = date.strftime("%Y")
-                                    month_part = date.strftime("%m")
-                                    day_part = date.strftime("%d")
-
-                                temp_name = self.naming_pattern.format(
-                                    date=date_key,
-                                    sequence=sequence_number_raw, 
-                                    wrapped_sequence=wrapped_sequence,
-                                    year=year_part,
-                                    month=month_part,
-                                    day=day_part,
-                                    separator=self.file_separator if self.file_separator != "无" else " " 
-                                )
-
-                                base_name = temp_name.strip()
-
-                                base_name = re.sub(r'\s+', ' ', base_name)
-
-                                custom_sep = self.file_separator if self.file_separator != "无" else " "
-                                if custom_sep:
-                                    custom_sep_pattern = re.escape(custom_sep)
-                                    base_name = re.sub(f'(^[{custom_sep_pattern}\\s]+)|([{custom_sep_pattern}\\s]+$)', '', base_name)
-
-                                if not base_name and wrapped_sequence:
-                                    base_name = wrapped_sequence
-                                
-                            except Exception as e:
-                                if date_key == "N":
-                                    date_part = "未知日期"
-                                else:
-                                    date_part = date_key
-
-                                base_name = f"{date_part}{self.file_separator if self.file_separator != '无' else ' '}{wrapped_sequence}"
-                                if progress_callback:
-                                    self._progress_callback_wrapper(message=f"[Warning] 自定义命名失败，使用默认命名: {str(e)}", core_callback=progress_callback)
+                        try:
+                            base_name, wrapped_sequence = name_formatter(date, date_key, current_sequence + 1, total_seq_count)
+                        except Exception as e:
+                            wrapped_sequence = name_formatter.wrap(name_formatter.sequence_text(current_sequence + 1, total_seq_count))
+                            date_part = "未知日期" if date_key == "N" else date_key
+                            base_name = f"{date_part}{name_formatter.separator}{wrapped_sequence}"
+                            if progress_callback:
+                                self._progress_callback_wrapper(message=f"[Warning] 自定义命名失败，使用默认命名: {str(e)}", core_callback=progress_callback)
 
                     file_ext = Path(file_path).suffix
-                    new_filename = base_name + file_ext
-                    new_file_path = os.path.join(target_folder, new_filename)
-
-                    if os.path.exists(new_file_path):
-                        unique_base_name = base_name.replace(wrapped_sequence, "").strip(self.file_separator if self.file_separator != "无" else " ")
-
-                        if not unique_base_name:
-                             unique_base_name = Path(file_path).stem
-                        
-                        unique_base_name = unique_base_name.strip(' -_')
-
-                        new_file_path = FileOperations.get_unique_filename(target_folder, unique_base_name, file_ext)
-
-
-                    if not is_resort:
-                        if os.path.exists(new_file_path):
-                            if FileOperations.are_files_identical(original_path, new_file_path):
-                                try:
-                                    os.remove(original_path)
-                                    self.identical_files_removed += 1
-                                    if progress_callback:
-                                        self._progress_callback_wrapper(message=f"[Info] 删除完全相同的文件: {Path(original_path).name}", core_callback=progress_callback)
-                                    current_counts[date_key][file_type] += 1
-                                    processed_files += 1
-                                    continue
-                                except Exception as e:
-                                    if progress_callback:
-                                        self._progress_callback_wrapper(message=f"[Warning] 无法删除重复文件 {Path(original_path).name}: {str(e)}", core_callback=progress_callback)
+                    unique_base_name = base_name.replace(wrapped_sequence, "").strip(self.file_separator if self.file_separator != "无" else " ")
+
+                    if not unique_base_name:
+                         unique_base_name = Path(file_path).stem
+                    
+                    unique_base_name = unique_base_name.strip(' -_')
+
+                    planner.plan(original_path, target_folder, base_name, file_ext, unique_base_name,
+                                 target_folder=target_folder)
+                    current_counts[date_key][file_type] += 1
+
+        if self.export_rename_plan:
+            plan_path = os.path.join(dest_dir, RENAME_PLAN_FILE_NAME)
+            try:
+                planner.export(plan_path)
+                if progress_callback:
+                    self._progress_callback_wrapper(message=f"[Info] 重命名计划已导出: {plan_path}", core_callback=progress_callback)
+            except (OSError, TypeError) as e:
+                if progress_callback:
+                    self._progress_callback_wrapper(message=f"[Warning] 导出重命名计划失败: {str(e)}", core_callback=progress_callback)
 
+        self._execute_rename_plan(planner, processed_files, total_files, progress_callback, is_resort)
+
+    def uses_single_pass_numbering(self, is_resort=False):
+        """单遍最终编号只适用于默认文件夹和默认文件命名，此时已有文件名可以反解出日期和序号"""
+        return (self.single_pass_numbering and not is_resort
+                and self.folder_naming_mode == "default" and self.file_naming_mode == "default")
+
+    def _default_name_regex(self):
+        """匹配默认命名 "YYYY-MM-DD [NN].ext" 的正则，序号外层符号随 sequence_wrapper 变化"""
+        if self.sequence_wrapper and len(self.sequence_wrapper) >= 2:
+            sequence = re.escape(self.sequence_wrapper[0]) + r'(\d+)' + re.escape(self.sequence_wrapper[-1])
+        else:
+            sequence = r'(\d+)'
+        return re.compile(r'^(\d{4}-\d{2}-\d{2}) ' + sequence + r'(\.[^.]*)?$')
+
+    def _plan_existing_renumbering(self, dated_files, folder_structure, planner, name_formatter):
+        """单遍最终编号：把目标文件夹中已按默认规则命名的文件与本次新文件按日期合并，一次分配连续序号
+        已有文件只有序号真正变化时才规划重命名；新文件使用合并后的序号。
+        返回 {(日期键, 文件类型): (合并后总数, 新文件序号列表)}
+        """
+        name_regex = self._default_name_regex()
+        incoming = {RenamePlanner.path_key(file_path)
+                    for files in dated_files.values() for items in files.values() for file_path, _ in items}
+        sequence_plans = {}
+        renames = {}
+
+        for date_key, files in sorted(dated_files.items()):
+            if date_key == "N":
+                continue
+            folders = folder_structure.get(date_key) or folder_structure.get(date_key.split('-')[0], [])
+
+            existing = defaultdict(list)
+            for folder in folders:
+                for name in planner.existing_files(folder):
+                    match = name_regex.match(name)
+                    if not match:
+                        continue
+                    file_path = os.path.join(folder, name)
+                    if RenamePlanner.path_key(file_path) in incoming:
+                        continue
                     try:
-                        if original_path != new_file_path:
-                            self.rollback_log.append(('move', original_path, new_file_path))
-                            FileOperations.safe_move(original_path, new_file_path)
-                        canonical_target_folder = os.path.abspath(target_folder)
-                        self.final_folder_stats[canonical_target_folder] = self.final_folder_stats.get(canonical_target_folder, 0) + 1
+                        day = datetime.strptime(match.group(1), "%Y-%m-%d")
+                    except ValueError:
+                        continue
+                    file_type = self._classify_file_type(file_path)
+                    if file_type == 'other' or self._get_date_key(day) != date_key:
+                        continue
+                    existing[file_type].append((day, 0, int(match.group(2)), file_path, folder, name, match.group(3) or ""))
 
-                        current_counts[date_key][file_type] += 1
-                        processed_files += 1
-                        if progress_callback:
-                            progress = int(processed_files / total_files * 100)
-                            self.update_progress_estimate(progress)
-                            self._progress_callback_wrapper(value=progress, message="", core_callback=progress_callback)
+            for file_type, items in existing.items():
+                new_files = files.get(file_type, [])
+                if not new_files:
+                    continue
+                merged = list(items)
+                for index, (_, date) in enumerate(new_files):
+                    merged.append((datetime(date.year, date.month, date.day), 1, index, None, None, None, None))
+                merged.sort(key=lambda item: item[:3])
+
+                new_sequences = [0] * len(new_files)
+                for sequence, (day, is_new, index, file_path, folder, name, file_ext) in enumerate(merged, 1):
+                    if is_new:
+                        new_sequences[index] = sequence
+                        continue
+                    base_name, _ = name_formatter(day, date_key, sequence, len(merged))
+                    date_part = day.strftime("%Y-%m-%d")
+                    if base_name + file_ext != name:
+                        renames[RenamePlanner.path_key(file_path)] = (file_path, folder, base_name, file_ext, date_part)
+
+                sequence_plans[(date_key, file_type)] = (len(merged), new_sequences)
+
+        # 已有文件之间的重命名可能形成链（A 的新名是 B 的旧名），先执行链尾，保证每一步的目标名都已空出
+        while renames:
+            key = next(iter(renames))
+            chain = []
+            while key in renames:
+                rename = renames.pop(key)
+                chain.append(rename)
+                key = RenamePlanner.path_key(os.path.join(rename[1], rename[2] + rename[3]))
+            for file_path, folder, base_name, file_ext, date_part in reversed(chain):
+                planner.plan(file_path, folder, base_name, file_ext, date_part, target_folder=folder, existing=True)
+
+        return sequence_plans
+
+    def _execute_rename_plan(self, planner, processed_files, total_files, progress_callback=None, is_resort=False):
+        """按规划顺序执行移动；目标名与已有文件冲突时先检查内容是否相同
+        规划时已假定前面的文件会移走并空出名称，若某个移动失败，其原名称重新标记为占用，后续用到该名称的条目改用唯一名称
+        直接改名返回 EXDEV（与目标不在同一设备）的文件交给移动引擎的复制线程池，复制的同时继续处理后面的同设备改名；
+        后面条目的目标名恰是某个复制中文件的原名时，先等该复制结束
+        """
+        blocked = set()
+        copying = set()
+        if self.journal is not None:
+            self.journal.record_plan([(entry['source'], entry['destination']) for entry in planner.entries])
 
-                    except Exception as e:
-                        if progress_callback:
-                            self._progress_callback_wrapper(message=f"[Error] 移动文件失败 {Path(original_path).name} -> {Path(new_file_path).name}: {str(e)}", core_callback=progress_callback)
+        engine = MoveEngine(self.copy_workers)
+        in_flight = deque()
+
+        try:
+            for entry in planner.entries:
+                if progress_callback and self._progress_callback_wrapper(check_terminate=True, core_callback=progress_callback):
+                    self.is_terminated = True
+                    return
+
+                original_path = entry['source']
+                new_file_path = entry['destination']
+                target_folder = entry['target_folder']
+
+                if not is_resort and entry['collides_with'] and not entry.get('existing'):
+                    if FileOperations.are_files_identical(original_path, entry['collides_with'], self.sampling_threshold):
+                        if self._handle_duplicate(original_path, entry['collides_with'], progress_callback):
+                            processed_files += 1
+                            continue
+
+                destination_key = RenamePlanner.path_key(new_file_path)
+                while destination_key in copying:
+                    processed_files = self._finish_copy(in_flight.popleft(), planner, blocked, copying,
+                                                        processed_files, total_files, progress_callback)
 
+                if destination_key in blocked:
+                    base_name, file_ext = os.path.splitext(os.path.basename(new_file_path))
+                    new_file_path = planner.unique_path(target_folder, base_name, file_ext)
+                    planner.reserve(new_file_path)
+
+                try:
+                    if original_path != new_file_path:
+                        os.makedirs(os.path.dirname(new_file_path), exist_ok=True)
+                        if not engine.rename(original_path, new_file_path):
+                            in_flight.append((engine.submit(original_path, new_file_path), entry, new_file_path))
+                            copying.add(RenamePlanner.path_key(original_path))
+                            while len(in_flight) > engine.copy_workers * 2 or (in_flight and in_flight[0][0].done()):
+                                processed_files = self._finish_copy(in_flight.popleft(), planner, blocked, copying,
+                                                                    processed_files, total_files, progress_callback)
+                            continue
+
+                        self.rollback_log.append(('move', original_path, new_file_path))
+                        FileOperations.forget_file_stat(original_path)
+                    self._record_move(entry, original_path, new_file_path)
+
+                    processed_files += 1
+                    self._report_move_progress(processed_files, total_files, progress_callback)
+
+                except Exception as e:
+                    blocked.add(RenamePlanner.path_key(original_path))
+                    planner.reserve(original_path)
+                    if progress_callback:
+                        self._progress_callback_wrapper(message=f"[Error] 移动文件失败 {Path(original_path).name} -> {Path(new_file_path).name}: {str(e)}", core_callback=progress_callback)
+        finally:
+            while in_flight:
+                processed_files = self._finish_copy(in_flight.popleft(), planner, blocked, copying,
+                                                    processed_files, total_files, progress_callback)
+            engine.close()
+
+        if progress_callback and engine.files_copied:
+            self._progress_callback_wrapper(message=f"[Info] 跨设备复制 {engine.files_copied} 个文件，共 {engine.bytes_copied / 1024 / 1024:.1f} MB，"
+                                                    f"平均 {engine.throughput() / 1024 / 1024:.1f} MB/s", core_callback=progress_callback)
         if progress_callback:
             self._progress_callback_wrapper(value=100, message="[Success] 所有文件移动完成", core_callback=progress_callback)
 
+    def _finish_copy(self, item, planner, blocked, copying, processed_files, total_files, progress_callback=None):
+        """等待一个跨设备复制完成并做移动后的记录，返回更新后的已处理文件数
+        复制失败时与同设备移动失败一样，把源文件名标记为占用
+        """
+        future, entry, new_file_path = item
+        original_path = entry['source']
+        copying.discard(RenamePlanner.path_key(original_path))
+        try:
+            future.result()
+        except Exception as e:
+            blocked.add(RenamePlanner.path_key(original_path))
+            planner.reserve(original_path)
+            if progress_callback:
+                self._progress_callback_wrapper(message=f"[Error] 移动文件失败 {Path(original_path).name} -> {Path(new_file_path).name}: {str(e)}", core_callback=progress_callback)
+            return processed_files
+
+        self.rollback_log.append(('move', original_path, new_file_path))
+        FileOperations.forget_file_stat(original_path)
+        self._record_move(entry, original_path, new_file_path)
+
+        processed_files += 1
+        self._report_move_progress(processed_files, total_files, progress_callback)
+        return processed_files
+
+    def _record_move(self, entry, original_path, new_file_path):
+        """移动完成后写日志、更新元数据缓存中的路径并统计目标文件夹"""
+        if original_path != new_file_path:
+            self.touched_directories.add(os.path.dirname(original_path))
+            self._journal_operation('move', original_path, new_file_path)
+            MetadataExtractor.record_file_moved(original_path, new_file_path)
+        if not entry.get('existing'):
+            canonical_target_folder = os.path.abspath(entry['target_folder'])
+            self.final_folder_stats[canonical_target_folder] = self.final_folder_stats.get(canonical_target_folder, 0) + 1
+
+    def _report_move_progress(self, processed_files, total_files, progress_callback=None):
+        if progress_callback:
+            progress = int(processed_files / total_files * 100)
+            self.update_progress_estimate(progress)
+            self._progress_callback_wrapper(value=progress, message="", core_callback=progress_callback)
+
     def load_settings(self):
         """从文件加载设置"""
         try:
@@ -364,6 +535,31 @@ class FileOrganizer:
                 self.other_files_folder = settings.get('other_files_folder', DEFAULT_OTHER_FILES_FOLDER)
                 self.no_date_files_folder = settings.get('no_date_files_folder', DEFAULT_NO_DATE_FOLDER)
                 self.max_files_per_folder = settings.get('max_files_per_folder', MAX_FILES_PER_FOLDER)
+                self.scan_workers = settings.get('scan_workers', DEFAULT_SCAN_WORKERS)
+                self.pipeline_mode = settings.get('pipeline_mode', False)
+                self.metadata_workers = settings.get('metadata_workers', DEFAULT_METADATA_WORKERS)
+                self.pipeline_queue_size = settings.get('pipeline_queue_size', DEFAULT_PIPELINE_QUEUE_SIZE)
+                self.date_extraction_mode = settings.get('date_extraction_mode', 'serial')
+                self.date_workers = settings.get('date_workers', DEFAULT_DATE_WORKERS)
+                self.date_chunk_size = settings.get('date_chunk_size', DEFAULT_DATE_CHUNK_SIZE)
+                self.ffprobe_workers = settings.get('ffprobe_workers', DEFAULT_FFPROBE_WORKERS)
+                self.ffprobe_timeout = settings.get('ffprobe_timeout', DEFAULT_FFPROBE_TIMEOUT)
+                self.use_persistent_cache = settings.get('use_persistent_cache', True)
+                self.metadata_cache_entries = settings.get('metadata_cache_entries', METADATA_CACHE_MAX_ENTRIES)
+                self.detect_duplicates = settings.get('detect_duplicates', True)
+                self.dedup_action = settings.get('dedup_action', 'delete')
+                self.hash_algorithm = settings.get('hash_algorithm', DEFAULT_HASH_ALGORITHM)
+                self.hash_workers = settings.get('hash_workers', DEFAULT_HASH_WORKERS)
+                self.sampling_threshold = settings.get('sampling_threshold', SAMPLING_PREFILTER_THRESHOLD)
+                self.dedup_compare_threshold = settings.get('dedup_compare_threshold', DEDUP_COMPARE_THRESHOLD)
+                self.detect_near_duplicates = settings.get('detect_near_duplicates', False)
+                self.near_duplicate_threshold = settings.get('near_duplicate_threshold', DEFAULT_NEAR_DUPLICATE_THRESHOLD)
+                self.export_rename_plan = settings.get('export_rename_plan', False)
+                self.single_pass_numbering = settings.get('single_pass_numbering', False)
+                self.use_move_journal = settings.get('use_move_journal', True)
+                self.journal_fsync_interval = settings.get('journal_fsync_interval', JOURNAL_FSYNC_INTERVAL)
+                self.rollback_workers = settings.get('rollback_workers', DEFAULT_ROLLBACK_WORKERS)
+                self.copy_workers = settings.get('copy_workers', DEFAULT_COPY_WORKERS)
 
         except (IOError, json.JSONDecodeError) as e:
             print(f"加载设置失败: {str(e)}")
@@ -394,7 +590,32 @@ class FileOrganizer:
                 'organize_other_files': self.organize_other_files,
                 'other_files_folder': self.other_files_folder,
                 'no_date_files_folder': self.no_date_files_folder,
-                'max_files_per_folder': self.max_files_per_folder
+                'max_files_per_folder': self.max_files_per_folder,
+                'scan_workers': self.scan_workers,
+                'pipeline_mode': self.pipeline_mode,
+                'metadata_workers': self.metadata_workers,
+                'pipeline_queue_size': self.pipeline_queue_size,
+                'date_extraction_mode': self.date_extraction_mode,
+                'date_workers': self.date_workers,
+                'date_chunk_size': self.date_chunk_size,
+                'ffprobe_workers': self.ffprobe_workers,
+                'ffprobe_timeout': self.ffprobe_timeout,
+                'use_persistent_cache': self.use_persistent_cache,
+                'metadata_cache_entries': self.metadata_cache_entries,
+                'detect_duplicates': self.detect_duplicates,
+                'dedup_action': self.dedup_action,
+                'hash_algorithm': self.hash_algorithm,
+                'hash_workers': self.hash_workers,
+                'sampling_threshold': self.sampling_threshold,
+                'dedup_compare_threshold': self.dedup_compare_threshold,
+                'detect_near_duplicates': self.detect_near_duplicates,
+                'near_duplicate_threshold': self.near_duplicate_threshold,
+                'export_rename_plan': self.export_rename_plan,
+                'single_pass_numbering': self.single_pass_numbering,
+                'use_move_journal': self.use_move_journal,
+                'journal_fsync_interval': self.journal_fsync_interval,
+                'rollback_workers': self.rollback_workers,
+                'copy_workers': self.copy_workers
             }
 
             with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
@@ -479,12 +700,19 @@ class FileOrganizer:
         self.is_terminated = False
         self.rollback_log = []
         self.identical_files_removed = 0
+        self.identical_files_linked = 0
+        self.duplicate_map = {}
+        self.near_duplicate_groups = []
         self.log_search_term = ""
         self.log_filter_level = "ALL"
         self.operation_start_time = 0
         self.current_operation = ""
         self.estimated_remaining_time = 0
         self.final_folder_stats = {}
+        self.touched_directories = set()
+        self._close_journal()
+        FileOperations.clear_stat_cache()
+        MetadataExtractor.close_persistent_cache()
 
     def set_naming_pattern(self, pattern):
         """设置文件命名模式"""
@@ -534,6 +762,102 @@ class FileOrganizer:
         """设置单个文件夹最大文件数"""
         self.max_files_per_folder = max_files
 
+    def set_scan_workers(self, workers):
+        """设置目录扫描线程数"""
+        self.scan_workers = max(1, int(workers))
+
+    def set_pipeline_mode(self, enabled, workers=None, queue_size=None):
+        """设置是否使用扫描与日期提取并行的流水线模式"""
+        self.pipeline_mode = enabled
+        if workers:
+            self.metadata_workers = max(1, int(workers))
+        if queue_size:
+            self.pipeline_queue_size = max(1, int(queue_size))
+
+    def set_date_extraction_mode(self, mode, workers=None, chunk_size=None):
+        """设置日期提取方式："serial" 单线程，"process" 多进程"""
+        self.date_extraction_mode = mode
+        if workers:
+            self.date_workers = max(1, int(workers))
+        if chunk_size:
+            self.date_chunk_size = max(1, int(chunk_size))
+
+    def set_ffprobe_options(self, workers=None, timeout=None):
+        """设置 ffprobe 并发数和单文件超时（秒）"""
+        if workers:
+            self.ffprobe_workers = max(1, int(workers))
+        if timeout:
+            self.ffprobe_timeout = max(1, int(timeout))
+
+    def set_use_persistent_cache(self, enabled):
+        """设置是否使用持久化元数据缓存"""
+        self.use_persistent_cache = enabled
+
+    def set_metadata_cache_entries(self, max_entries):
+        """设置内存元数据缓存的最大条目数"""
+        self.metadata_cache_entries = max(1, int(max_entries))
+
+    def set_detect_duplicates(self, enabled):
+        """设置是否在移动前对全部文件做重复检测"""
+        self.detect_duplicates = enabled
+
+    def set_hash_options(self, algorithm=None, workers=None):
+        """设置重复检测使用的哈希算法（md5 / blake2b / sha256）和哈希线程数"""
+        if algorithm:
+            if algorithm.lower() not in HASH_ALGORITHMS:
+                raise ValueError(f"不支持的哈希算法: {algorithm}")
+            self.hash_algorithm = algorithm.lower()
+        if workers:
+            self.hash_workers = max(1, int(workers))
+
+    def set_verification_thresholds(self, sampling_threshold=None, compare_threshold=None):
+        """设置重复校验的分级阈值（字节）
+        sampling_threshold: 超过此大小的文件先做抽样哈希预筛，再逐块比较
+        compare_threshold: 全局去重中超过此大小的文件改为逐块比较，不做完整哈希
+        """
+        if sampling_threshold is not None:
+            self.sampling_threshold = max(0, int(sampling_threshold))
+        if compare_threshold is not None:
+            self.dedup_compare_threshold = max(0, int(compare_threshold))
+
+    def set_near_duplicate_detection(self, enabled, threshold=None):
+        """设置是否检测相似图片（只报告分组，不删除）以及判定相似的汉明距离阈值"""
+        self.detect_near_duplicates = enabled
+        if threshold is not None:
+            self.near_duplicate_threshold = max(0, int(threshold))
+
+    def set_export_rename_plan(self, enabled):
+        """设置是否在执行移动前把重命名计划导出到目标目录"""
+        self.export_rename_plan = enabled
+
+    def set_single_pass_numbering(self, enabled):
+        """设置是否在本次整理中直接合并目标目录已有文件并分配最终连续序号，不再执行第二遍重新整理"""
+        self.single_pass_numbering = enabled
+
+    def set_move_journal(self, enabled, fsync_interval=None):
+        """设置是否在目标目录写入可恢复的移动日志，以及每写多少条记录 fsync 一次"""
+        self.use_move_journal = enabled
+        if fsync_interval is not None:
+            self.journal_fsync_interval = max(1, int(fsync_interval))
+
+    def set_rollback_workers(self, workers):
+        """设置回退时并行执行重命名的线程数"""
+        self.rollback_workers = max(1, int(workers))
+
+    def set_copy_workers(self, workers):
+        """设置跨设备移动时并行复制的线程数"""
+        self.copy_workers = max(1, int(workers))
+
+    def _open_metadata_cache(self, progress_callback=None):
+        """打开持久化元数据缓存，失败时仅使用内存缓存"""
+        if not self.use_persistent_cache or MetadataExtractor._persistent_cache is not None:
+            return
+        try:
+            MetadataExtractor.set_persistent_cache(PersistentMetadataCache(METADATA_CACHE_FILE))
+        except Exception as e:
+            if progress_callback:
+                self._progress_callback_wrapper(message=f"[Warning] 打开元数据缓存失败，本次仅使用内存缓存: {str(e)}", core_callback=progress_callback)
+
     def _progress_callback_wrapper(self, value=None, message=None, check_terminate=False, progress_offset=0,
                                    progress_scale=100, is_backup=False, core_callback=None):
         """核心回调函数的包装器，处理暂停/终止检查和进度缩放 - 修复消息为None的问题"""
@@ -573,12 +897,18 @@ class FileOrganizer:
         """设置重复文件处理方式"""
         self.duplicate_handling = method
 
+    def set_dedup_action(self, action):
+        """设置完全相同文件的处理方式："delete" 删除，"hardlink" 替换为硬链接，"reflink" 替换为写时复制克隆"""
+        if action not in DEDUP_ACTIONS:
+            raise ValueError(f"不支持的重复文件处理方式: {action}")
+        self.dedup_action = action
+
     def log(self, message, tag='[Core]'):
         """简单的日志方法，用于在 GUI 外部运行时显示信息"""
         print(f"{tag} {message}")
 
     def scan_directory(self, directory, exclude_dir=None, is_resort=False):
-        """扫描目录中的媒体文件 - 使用多线程优化
+        """扫描目录中的媒体文件 - 使用多线程目录遍历优化
         is_resort: 是否为重新整理模式，重新整理时只扫描目标目录的直接内容
         """
         if exclude_dir:
@@ -587,7 +917,11 @@ class FileOrganizer:
         try:
             self.start_operation_timing("文件扫描")
 
-            scanned_files = self._scan_directory_fallback(directory, exclude_dir, is_resort)
+            if is_resort or self.scan_workers <= 1:
+                scanned_files = self._scan_directory_fallback(directory, exclude_dir, is_resort)
+            else:
+                walker = ParallelDirectoryWalker(self._create_scanner(exclude_dir), self.scan_workers)
+                scanned_files = walker.walk(directory, check_terminate=lambda: self.is_terminated)
             
             for key in ['images', 'videos', 'documents', 'other']:
                 if key not in scanned_files:
@@ -601,85 +935,35 @@ class FileOrganizer:
             print(f"扫描目录失败: {str(e)}")
             return self._scan_directory_fallback(directory, exclude_dir, is_resort)
 
+    def _create_scanner(self, exclude_dir=None):
+        """根据当前格式设置创建目录扫描器"""
+        return DirectoryScanner(self.image_formats, self.video_formats, self.document_formats,
+                                self.other_formats, exclude_dirs=[exclude_dir] if exclude_dir else None)
+
     def _scan_directory_fallback(self, directory, exclude_dir=None, is_resort=False):
-        """回退的单线程目录扫描
+        """单线程目录扫描，基于 os.scandir 单遍完成分类并缓存文件状态
         is_resort: 是否为重新整理模式，重新整理时只扫描目标目录的直接内容
         """
-        images = []
-        videos = []
-        documents = []
-        other_files = []
-
-        directory = os.path.abspath(directory)
-        if exclude_dir:
-            exclude_dir = os.path.abspath(exclude_dir)
-
-        if is_resort:
-            try:
-                for item in os.listdir(directory):
-                    item_path = os.path.join(directory, item)
-
-                    if os.path.isfile(item_path):
-                        file = item
-                        if file.startswith('.') or file.endswith('.zip'):
-                            continue
-
-                        file_path = item_path
-                        file_ext = Path(file).suffix.lower()
-
-                        if exclude_dir and os.path.abspath(file_path).startswith(exclude_dir):
-                            continue
-
-                        if file_ext in self.image_formats:
-                            images.append(file_path)
-                        elif file_ext in self.video_formats:
-                            videos.append(file_path)
-                        elif file_ext in self.document_formats:
-                            documents.append(file_path)
-                        elif file_ext in self.other_formats:
-                            other_files.append(file_path)
-                        else:
-                            other_files.append(file_path)
-            except Exception as e:
-                print(f"扫描目录失败: {str(e)}")
-        else:
-            for root, dirs, files in os.walk(directory):
-                dirs[:] = [d for d in dirs if
-                           not d.startswith('.') and BACKUP_FOLDER_NAME.lower() not in d.lower() and "BACKUP" not in d.upper()]
-                
-                if exclude_dir:
-                    dirs[:] = [d for d in dirs if not os.path.abspath(os.path.join(root, d)).startswith(exclude_dir)]
-
-                for file in files:
-                    if file.startswith('.') or file.endswith('.zip'):
-                        continue
-
-                    file_path = os.path.join(root, file)
-                    file_ext = Path(file).suffix.lower()
-
-                    if exclude_dir and os.path.abspath(file_path).startswith(exclude_dir):
-                        continue
-
-                    if file_ext in self.image_formats:
-                        images.append(file_path)
-                    elif file_ext in self.video_formats:
-                        videos.append(file_path)
-                    elif file_ext in self.document_formats:
-                        documents.append(file_path)
-                    elif file_ext in self.other_formats:
-                        other_files.append(file_path)
-                    else:
-                        other_files.append(file_path)
-
-        self.scanned_files = {'images': images, 'videos': videos, 'documents': documents, 'other': other_files}
+        scanner = self._create_scanner(exclude_dir)
+        self.scanned_files = scanner.scan_directory(directory, recursive=not is_resort)
         return self.scanned_files
 
     def organize_media(self, source_dir, dest_dir, backup=True, progress_callback=None, is_resort=False):
-        """主要的整理功能"""
+        """主要的整理功能；运行结束后释放扫描阶段的文件状态缓存"""
+        try:
+            return self._organize_media(source_dir, dest_dir, backup, progress_callback, is_resort)
+        finally:
+            FileOperations.clear_stat_cache()
+
+    def _organize_media(self, source_dir, dest_dir, backup=True, progress_callback=None, is_resort=False):
+        """整理流程：备份、扫描、日期提取、去重、移动和清理"""
         if not is_resort:
             self.reset_state()
 
         os.makedirs(dest_dir, exist_ok=True)
+        MetadataExtractor.configure_ffprobe(self.ffprobe_workers, self.ffprobe_timeout)
+        MetadataExtractor.configure_cache(self.metadata_cache_entries)
+        self._open_metadata_cache(progress_callback)
 
         if progress_callback:
             self._progress_callback_wrapper(value=0, message="[Progress] 启动整理过程...", core_callback=progress_callback)
@@ -716,9 +1000,17 @@ class FileOrganizer:
         if progress_callback:
             self._progress_callback_wrapper(value=16, message="[Progress] 正在大规模扫描源目录...", core_callback=progress_callback)
 
+        exclude_path = None if is_resort else dest_dir
+        use_pipeline = self.pipeline_mode and not is_resort
+        dated_files = None
+
         try:
-            exclude_path = None if is_resort else dest_dir
-            files = self.scan_directory(source_dir, exclude_path, is_resort)
+            if use_pipeline:
+                if progress_callback:
+                    self._progress_callback_wrapper(value=20, message="[Progress] 流水线模式: 扫描的同时提取元数据和日期信息...", core_callback=progress_callback)
+                files, dated_files = self._scan_and_group_pipelined(source_dir, exclude_path, progress_callback)
+            else:
+                files = self.scan_directory(source_dir, exclude_path, is_resort)
             
             for key in ['images', 'videos', 'documents', 'other']:
                 if key not in files:
@@ -738,20 +1030,58 @@ class FileOrganizer:
                 'folder_structure': {}, 'identical_files_removed': 0
             }
 
-        if progress_callback:
-            self._progress_callback_wrapper(value=18, message=f"[Info] 扫描完成: 找到 {len(all_media)} 个文件。", core_callback=progress_callback)
-            self._progress_callback_wrapper(value=20, message="[Progress] 正在提取元数据和日期信息 (耗时操作)...", core_callback=progress_callback)
+        media_to_group = all_media
+        if self.detect_duplicates and not is_resort:
+            dedup_candidates = all_media
+            if not self.organize_other_files:
+                dedup_candidates = files['images'] + files['videos'] + files['documents']
+            try:
+                self._find_duplicate_files(dedup_candidates, progress_callback)
+            except Exception as e:
+                self.duplicate_map = {}
+                if progress_callback:
+                    self._progress_callback_wrapper(message=f"[Warning] 重复文件检测失败，跳过去重: {str(e)}", core_callback=progress_callback)
 
-        try:
-            metadata_progress_callback = lambda val=None, msg=None, check_terminate=False: self._progress_callback_wrapper(
-                value=val, message=msg, check_terminate=check_terminate,
-                progress_offset=20, progress_scale=5, core_callback=progress_callback
-            )
-            dated_files = self._group_files_by_date(all_media, metadata_progress_callback)
-        except Exception as e:
+            if self.is_terminated:
+                return "TERMINATED"
+
+            if self.duplicate_map:
+                media_to_group = [file_path for file_path in all_media if os.path.abspath(file_path) not in self.duplicate_map]
+                if dated_files is not None:
+                    self._drop_duplicates_from_groups(dated_files)
+
+        if self.detect_near_duplicates and not is_resort and files['images']:
+            try:
+                self._find_near_duplicate_images(files['images'], progress_callback)
+            except Exception as e:
+                self.near_duplicate_groups = []
+                if progress_callback:
+                    self._progress_callback_wrapper(message=f"[Warning] 相似图片检测失败: {str(e)}", core_callback=progress_callback)
+
+            if self.is_terminated:
+                return "TERMINATED"
+
+        if dated_files is not None:
             if progress_callback:
-                self._progress_callback_wrapper(message=f"[Error] 日期提取失败: {str(e)}", core_callback=progress_callback)
-            raise e
+                self._progress_callback_wrapper(value=24, message=f"[Info] 扫描和日期提取完成: 找到 {len(all_media)} 个文件。", core_callback=progress_callback)
+        else:
+            if progress_callback:
+                self._progress_callback_wrapper(value=18, message=f"[Info] 扫描完成: 找到 {len(all_media)} 个文件。", core_callback=progress_callback)
+                self._progress_callback_wrapper(value=20, message="[Progress] 正在提取元数据和日期信息 (耗时操作)...", core_callback=progress_callback)
+
+            try:
+                metadata_progress_callback = lambda val=None, msg=None, check_terminate=False: self._progress_callback_wrapper(
+                    value=val, message=msg, check_terminate=check_terminate,
+                    progress_offset=20, progress_scale=5, core_callback=progress_callback
+                )
+                dated_files = self._group_files_by_date(media_to_group, metadata_progress_callback)
+            except Exception as e:
+                if progress_callback:
+                    self._progress_callback_wrapper(message=f"[Error] 日期提取失败: {str(e)}", core_callback=progress_callback)
+                raise e
+
+            if self.is_terminated:
+                return "TERMINATED"
 
         if progress_callback:
             self._progress_callback_wrapper(value=25, message="[Progress] 日期提取和分组完成。正在创建文件夹结构...", core_callback=progress_callback)
@@ -773,6 +1103,8 @@ class FileOrganizer:
             progress_offset=move_progress_offset, progress_scale=move_progress_scale, core_callback=progress_callback
         )
 
+        self._begin_journal(source_dir, dest_dir, progress_callback)
+
         try:
             self._move_files_to_folders(dated_files, folder_structure, source_dir, dest_dir, move_callback, is_resort)
         except Exception as e:
@@ -783,12 +1115,22 @@ class FileOrganizer:
         if self.is_terminated:
             return "TERMINATED"
 
-        self._cleanup_and_renumber_folders(dest_dir, progress_callback)
+        self._remove_duplicate_files(move_callback)
+        near_duplicate_groups = self._report_near_duplicates(dest_dir, progress_callback)
+
+        self._cleanup_and_renumber_folders(dest_dir, progress_callback, roots=[source_dir, dest_dir])
+        self._finish_journal()
         
         if progress_callback:
             self._progress_callback_wrapper(value=75, message="[Progress] 文件移动和清理完成", core_callback=progress_callback)
 
-        total_files_processed = len(all_media) - self.identical_files_removed
+        if progress_callback:
+            cache_stats = MetadataExtractor.get_cache_stats()
+            self._progress_callback_wrapper(message=f"[Info] 元数据缓存: {cache_stats['entries']}/{cache_stats['max_entries']} 条，"
+                                                    f"命中 {cache_stats['hits']}，未命中 {cache_stats['misses']}，淘汰 {cache_stats['evictions']}",
+                                            core_callback=progress_callback)
+
+        total_files_processed = len(all_media) - self.identical_files_removed - self.identical_files_linked
         total_folders_used = len(self.final_folder_stats)
         
         folder_list_message = f"总计创建/使用了 {total_folders_used} 个目标文件夹。\n"
@@ -806,6 +1148,7 @@ class FileOrganizer:
 总计处理文件: {len(all_media)}
 实际移动文件: {total_files_processed}
 删除了 {self.identical_files_removed} 个完全相同的文件 (重复)
+链接了 {self.identical_files_linked} 个完全相同的文件 (保留路径，共享存储)
 所有文件现已按日期顺序和序列号重命名
 ----------------------------------------
 {folder_list_message.strip()}
@@ -821,7 +1164,9 @@ class FileOrganizer:
             'documents_processed': len(files['documents']),
             'other_processed': len(files['other']),
             'folder_structure': folder_structure,
-            'identical_files_removed': self.identical_files_removed
+            'identical_files_removed': self.identical_files_removed,
+            'identical_files_linked': self.identical_files_linked,
+            'near_duplicate_groups': near_duplicate_groups
         }
 
         return result
@@ -881,56 +1226,284 @@ class FileOrganizer:
         return resort_result
 
     def _group_files_by_date(self, file_paths, progress_callback=None):
-        """按日期分组文件 - 修复版本，确保所有键都存在，并添加进度反馈"""
+        """按日期分组文件 - 修复版本，确保所有键都存在，并添加进度反馈
+        视频的 ffprobe 探测占前一半进度，期间可暂停/终止；被终止时返回已分组的部分结果
+        """
+        if self.date_extraction_mode == "process" and len(file_paths) > self.date_chunk_size:
+            try:
+                return self._group_files_by_date_parallel(file_paths, progress_callback)
+            except Exception as e:
+                if progress_callback:
+                    self._progress_callback_wrapper(message=f"[Warning] 多进程日期提取失败，回退到单线程: {str(e)}", core_callback=progress_callback)
+
         dated_files = {}
 
+        pending_probes = MetadataExtractor.pending_video_probes([os.path.abspath(file_path) for file_path in file_paths],
+                                                                self.date_priority_list)
+        probe_share = 50 if pending_probes else 0
+
+        def report_probe(done, total):
+            if self._progress_callback_wrapper(check_terminate=True, core_callback=progress_callback):
+                return True
+            if progress_callback:
+                progress_callback(int(done / total * probe_share), "")
+            return False
+
+        if not MetadataExtractor.probe_videos(pending_probes, report_probe):
+            return dated_files
+
         for i, file_path in enumerate(file_paths):
             abs_file_path = os.path.abspath(file_path)
+            date = self._extract_file_date(abs_file_path, progress_callback)
+            self._add_dated_file(dated_files, abs_file_path, date)
 
-            try:
-                date = MetadataExtractor.get_file_date(abs_file_path, self.date_priority_list)
-            except Exception as e:
+            if i % 10 == 0:
+                if self._progress_callback_wrapper(check_terminate=True, core_callback=progress_callback):
+                    return dated_files
                 if progress_callback:
-                    self._progress_callback_wrapper(message=f"[Warning] 提取文件日期失败 {Path(abs_file_path).name}: {str(e)}", core_callback=progress_callback)
-                try:
-                    date = datetime.fromtimestamp(os.path.getmtime(abs_file_path))
-                except:
-                    date = datetime.now()
-            
-            file_ext = Path(abs_file_path).suffix.lower()
+                    progress = probe_share + int((i + 1) / len(file_paths) * (100 - probe_share))
+                    progress_callback(progress, "")
 
-            if date.year <= 1970:
-                date_key = "N"  
-            else:
-                if self.organization_mode == "daily":
-                    date_key = date.strftime("%Y-%m-%d")
-                elif self.organization_mode == "monthly":
-                    date_key = date.strftime("%Y-%m")
-                else:  
-                    date_key = date.strftime("%Y")
+        self._sort_dated_files(dated_files)
+        return dated_files
 
-            if date_key not in dated_files:
-                dated_files[date_key] = {'images': [], 'videos': [], 'documents': [], 'other': []}
+    def _group_files_by_date_parallel(self, file_paths, progress_callback=None):
+        """使用进程池分批提取日期，子进程只返回 (路径, 时间戳, 来源)"""
+        abs_paths = [os.path.abspath(file_path) for file_path in file_paths]
+        chunks = [abs_paths[i:i + self.date_chunk_size] for i in range(0, len(abs_paths), self.date_chunk_size)]
 
-            if file_ext in self.image_formats:
-                dated_files[date_key]['images'].append((abs_file_path, date))
-            elif file_ext in self.video_formats:
-                dated_files[date_key]['videos'].append((abs_file_path, date))
-            elif file_ext in self.document_formats:
-                dated_files[date_key]['documents'].append((abs_file_path, date))
-            else:
-                dated_files[date_key]['other'].append((abs_file_path, date))
+        dated_files = {}
+        processed = 0
+        ffprobe_slots = multiprocessing.BoundedSemaphore(max(1, self.ffprobe_workers))
+        with ProcessPoolExecutor(max_workers=self.date_workers, initializer=init_date_worker,
+                                 initargs=(self.ffprobe_workers, self.ffprobe_timeout, ffprobe_slots)) as executor:
+            cache_path = os.path.abspath(METADATA_CACHE_FILE) if self.use_persistent_cache else None
+            if MetadataExtractor._persistent_cache is not None:
+                MetadataExtractor._persistent_cache.flush()
+            futures = [executor.submit(extract_dates_batch, chunk, self.date_priority_list, cache_path)
+                       for chunk in chunks]
+
+            for future in as_completed(futures):
+                if progress_callback and progress_callback(check_terminate=True):
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+                for abs_file_path, timestamp, source in future.result():
+                    if timestamp is not None:
+                        date = datetime.fromtimestamp(timestamp)
+                    elif source is not None:
+                        date = datetime(1900, 1, 1)
+                    else:
+                        try:
+                            date = datetime.fromtimestamp(os.path.getmtime(abs_file_path))
+                        except OSError:
+                            date = datetime.now()
+                    self._add_dated_file(dated_files, abs_file_path, date)
 
-            if progress_callback and i % 10 == 0:  
-                progress = int((i + 1) / len(file_paths) * 100)
-                progress_callback(progress, "")
+                processed += 1
+                if progress_callback:
+                    progress_callback(int(processed / len(chunks) * 100), "")
+
+        self._sort_dated_files(dated_files)
+        return dated_files
 
+    def _extract_file_date(self, abs_file_path, progress_callback=None):
+        """提取单个文件的日期，失败时回退到修改时间"""
+        try:
+            return MetadataExtractor.get_file_date(abs_file_path, self.date_priority_list)
+        except Exception as e:
+            if progress_callback:
+                self._progress_callback_wrapper(message=f"[Warning] 提取文件日期失败 {Path(abs_file_path).name}: {str(e)}", core_callback=progress_callback)
+            try:
+                return datetime.fromtimestamp(os.path.getmtime(abs_file_path))
+            except:
+                return datetime.now()
+
+    def _get_date_key(self, date):
+        """根据整理模式计算日期分组键"""
+        if date.year <= 1970:
+            return "N"
+        if self.organization_mode == "daily":
+            return date.strftime("%Y-%m-%d")
+        elif self.organization_mode == "monthly":
+            return date.strftime("%Y-%m")
+        return date.strftime("%Y")
+
+    def _add_dated_file(self, dated_files, abs_file_path, date, file_type=None):
+        """把文件加入对应日期分组"""
+        date_key = self._get_date_key(date)
+
+        if date_key not in dated_files:
+            dated_files[date_key] = {'images': [], 'videos': [], 'documents': [], 'other': []}
+
+        if file_type is None:
+            file_type = self._classify_file_type(abs_file_path)
+
+        dated_files[date_key][file_type].append((abs_file_path, date))
+
+    def _classify_file_type(self, file_path):
+        """按扩展名判断文件类型"""
+        file_ext = Path(file_path).suffix.lower()
+        if file_ext in self.image_formats:
+            return 'images'
+        elif file_ext in self.video_formats:
+            return 'videos'
+        elif file_ext in self.document_formats:
+            return 'documents'
+        return 'other'
+
+    def _sort_dated_files(self, dated_files):
+        """每个分组内按日期排序"""
         for date_key in dated_files:
             for file_type in ['images', 'videos', 'documents', 'other']:
                 if file_type in dated_files[date_key]:
                     dated_files[date_key][file_type].sort(key=lambda x: x[1])
 
-        return dated_files
+    def _find_duplicate_files(self, file_paths, progress_callback=None):
+        """在移动前对本次会移动的文件做重复检测（不整理其他文件时不包含其他文件），结果记录在 duplicate_map 中"""
+        if progress_callback:
+            self._progress_callback_wrapper(message="[Progress] 正在检测重复文件...", core_callback=progress_callback)
+
+        detector = DuplicateDetector(hash_algorithm=self.hash_algorithm, hash_workers=self.hash_workers,
+                                     compare_threshold=self.dedup_compare_threshold)
+        self.duplicate_map = detector.find_duplicates(
+            [os.path.abspath(file_path) for file_path in file_paths],
+            check_terminate=lambda: self._progress_callback_wrapper(check_terminate=True, core_callback=progress_callback)
+        )
+
+        if progress_callback and self.duplicate_map:
+            self._progress_callback_wrapper(message=f"[Info] 发现 {len(self.duplicate_map)} 个完全相同的重复文件，将在整理后删除", core_callback=progress_callback)
+
+    def _drop_duplicates_from_groups(self, dated_files):
+        """从已分组的结果中去掉重复文件，只保留每组的保留文件"""
+        for date_key in list(dated_files):
+            for file_type in dated_files[date_key]:
+                dated_files[date_key][file_type] = [item for item in dated_files[date_key][file_type]
+                                                    if item[0] not in self.duplicate_map]
+            if not any(dated_files[date_key].values()):
+                del dated_files[date_key]
+
+    def _remove_duplicate_files(self, progress_callback=None):
+        """保留文件移动完成后按 dedup_action 处理重复文件，保留文件不存在时跳过"""
+        moved_paths = {entry[1]: entry[2] for entry in self.rollback_log if entry[0] == 'move'}
+
+        for duplicate, keeper in self.duplicate_map.items():
+            if progress_callback and progress_callback(check_terminate=True):
+                break
+
+            keeper_path = moved_paths.get(keeper, keeper)
+            if not os.path.exists(keeper_path):
+                if progress_callback:
+                    self._progress_callback_wrapper(message=f"[Warning] 保留文件不存在，跳过处理重复文件 {Path(duplicate).name}", core_callback=progress_callback)
+                continue
+
+            self._handle_duplicate(duplicate, keeper_path, progress_callback)
+
+        self.duplicate_map = {}
+
+    def _handle_duplicate(self, duplicate, keeper, progress_callback=None):
+        """处理与保留文件内容完全相同的重复文件：删除，或替换为指向保留文件的硬链接/reflink
+        返回是否已处理；链接失败时保留原文件不动，任一方是符号链接或两者是同一个文件时不处理
+        """
+        try:
+            if os.path.islink(duplicate) or os.path.islink(keeper) or os.path.samefile(duplicate, keeper):
+                if progress_callback:
+                    self._progress_callback_wrapper(message=f"[Warning] 重复文件与保留文件指向同一数据，保留原文件 {Path(duplicate).name}", core_callback=progress_callback)
+                return False
+        except OSError:
+            return False
+
+        if self.dedup_action in ("hardlink", "reflink"):
+            method = FileOperations.replace_with_link(duplicate, keeper, self.dedup_action)
+            if method is None:
+                if progress_callback:
+                    self._progress_callback_wrapper(message=f"[Warning] 无法为重复文件创建链接，保留原文件 {Path(duplicate).name}", core_callback=progress_callback)
+                return False
+
+            self.rollback_log.append(('link', duplicate, keeper))
+            self._journal_operation('link', duplicate, keeper)
+            self.identical_files_linked += 1
+            if progress_callback:
+                self._progress_callback_wrapper(message=f"[Info] 重复文件已替换为{'reflink' if method == 'reflink' else '硬链接'}: {Path(duplicate).name}", core_callback=progress_callback)
+            return True
+
+        try:
+            os.remove(duplicate)
+            FileOperations.forget_file_stat(duplicate)
+            self.touched_directories.add(os.path.dirname(duplicate))
+            self.identical_files_removed += 1
+            if progress_callback:
+                self._progress_callback_wrapper(message=f"[Info] 删除完全相同的文件: {Path(duplicate).name}", core_callback=progress_callback)
+            return True
+        except OSError as e:
+            if progress_callback:
+                self._progress_callback_wrapper(message=f"[Warning] 无法删除重复文件 {Path(duplicate).name}: {str(e)}", core_callback=progress_callback)
+            return False
+
+    def _find_near_duplicate_images(self, image_paths, progress_callback=None):
+        """计算图片感知哈希并用 BK 树查找相似图片分组，结果记录在 near_duplicate_groups 中"""
+        if progress_callback:
+            self._progress_callback_wrapper(message="[Progress] 正在计算图片感知哈希，查找相似图片...", core_callback=progress_callback)
+
+        candidates = [os.path.abspath(file_path) for file_path in image_paths]
+        candidates = [file_path for file_path in candidates if file_path not in self.duplicate_map]
+
+        pool = HashingPool(max_workers=self.hash_workers)
+        hashes = {file_path: hash_value
+                  for file_path, hash_value in pool.map(candidates, MetadataExtractor.get_perceptual_hash)
+                  if hash_value is not None}
+
+        if self._progress_callback_wrapper(check_terminate=True, core_callback=progress_callback):
+            return
+
+        self.near_duplicate_groups = group_near_duplicates(hashes, self.near_duplicate_threshold)
+        if progress_callback and self.near_duplicate_groups:
+            self._progress_callback_wrapper(message=f"[Info] 发现 {len(self.near_duplicate_groups)} 组相似图片，整理完成后报告，不会删除", core_callback=progress_callback)
+
+    def _report_near_duplicates(self, dest_dir, progress_callback=None):
+        """按整理后的位置报告相似图片分组，返回分组路径列表"""
+        if not self.near_duplicate_groups:
+            return []
+
+        moved_paths = {entry[1]: entry[2] for entry in self.rollback_log if entry[0] == 'move'}
+        groups = [[moved_paths.get(file_path, file_path) for file_path in group] for group in self.near_duplicate_groups]
+
+        if progress_callback:
+            lines = [f"[Info] 相似图片分组 (阈值 {self.near_duplicate_threshold})，共 {len(groups)} 组，请人工确认:"]
+            for index, group in enumerate(groups, 1):
+                names = ", ".join(os.path.relpath(file_path, dest_dir) if file_path.startswith(os.path.abspath(dest_dir)) else file_path
+                                  for file_path in group)
+                lines.append(f"  {index}. {names}")
+            self._progress_callback_wrapper(message="\n".join(lines), core_callback=progress_callback)
+
+        self.near_duplicate_groups = []
+        return groups
+
+    def _scan_and_group_pipelined(self, source_dir, exclude_dir=None, progress_callback=None):
+        """流水线模式：扫描与日期提取并行进行，返回 (扫描结果, 日期分组)"""
+        self.start_operation_timing("文件扫描与日期提取")
+
+        scanner = self._create_scanner(exclude_dir)
+        pipeline = ScanExtractPipeline(
+            scanner,
+            lambda file_path: self._extract_file_date(file_path, progress_callback),
+            workers=self.metadata_workers,
+            queue_size=self.pipeline_queue_size
+        )
+
+        files = DirectoryScanner.new_results()
+        dated_files = {}
+        for i, (file_type, file_path, date) in enumerate(pipeline.run(source_dir, check_terminate=lambda: self.is_terminated)):
+            files[file_type].append(file_path)
+            self._add_dated_file(dated_files, file_path, date, file_type)
+
+            if progress_callback and i % 500 == 0:
+                self._progress_callback_wrapper(value=20, message="", core_callback=progress_callback)
+
+        self._sort_dated_files(dated_files)
+        self.scanned_files = files
+        return files, dated_files
 
     def _create_folder_structure(self, dated_files, dest_dir):
         """创建文件夹结构 - 修复版本，支持多级文件夹"""
@@ -942,10 +1515,12 @@ class FileOrganizer:
 
         unknown_folder = os.path.join(dest_dir, self.no_date_files_folder)
         os.makedirs(unknown_folder, exist_ok=True)
+        self.touched_directories.add(unknown_folder)
         folder_structure["未知日期"] = [unknown_folder]
 
         other_folder = os.path.join(dest_dir, self.other_files_folder)
         os.makedirs(other_folder, exist_ok=True)
+        self.touched_directories.add(other_folder)
 
         for date_key, file_count in date_key_counts.items():
             if date_key == "N" or file_count == 0:
@@ -976,6 +1551,7 @@ class FileOrganizer:
                         folder_path = os.path.join(base_folder, folder_name)
                     
                     os.makedirs(folder_path, exist_ok=True)
+                    self.touched_directories.add(folder_path)
                     date_folders.append(folder_path)
 
                 folder_structure[date_key] = date_folders
@@ -997,28 +1573,26 @@ class FileOrganizer:
 
                     folder_path = os.path.join(dest_dir, folder_name)
                     os.makedirs(folder_path, exist_ok=True)
+                    self.touched_directories.add(folder_path)
                     date_folders.append(folder_path)
 
                 folder_structure[date_key] = date_folders
 
         return folder_structure
 
-    def _cleanup_and_renumber_folders(self, directory, progress_callback=None):
-        """清理空目录并重新编号文件夹"""
+    def _cleanup_and_renumber_folders(self, directory, progress_callback=None, roots=None):
+        """清理本次运行涉及且已变空的目录（由深到浅，不超出运行根目录），然后重新编号文件夹"""
         if progress_callback:
             self._progress_callback_wrapper(message="[Progress] 正在清理空目录并重新编号文件夹...", core_callback=progress_callback)
 
         try:
-            for root, dirs, files in os.walk(directory, topdown=False):
-                for dir_name in dirs:
-                    dir_path = os.path.join(root, dir_name)
-                    try:
-                        if not os.listdir(dir_path):
-                            os.rmdir(dir_path)
-                            if progress_callback:
-                                self._progress_callback_wrapper(message=f"[Info] 删除空目录: {dir_path}", core_callback=progress_callback)
-                    except OSError:
-                        pass
+            roots = sorted({os.path.abspath(root) for root in (roots or [directory]) if root},
+                           key=lambda path: path.count(os.sep), reverse=True)
+            for root in roots:
+                for dir_path in FileOperations.prune_empty_dirs(self.touched_directories, root, keep=roots):
+                    if progress_callback:
+                        self._progress_callback_wrapper(message=f"[Info] 删除空目录: {dir_path}", core_callback=progress_callback)
+            self.touched_directories.clear()
 
             self._renumber_folders(directory, progress_callback)
 
@@ -1090,19 +1664,112 @@ class FileOrganizer:
                 self._progress_callback_wrapper(message=f"[Warning] 重新编号文件夹失败: {str(e)}", core_callback=progress_callback)
 
     def rollback_operations(self, dest_dir):
-        """回退所有操作"""
+        """回退所有操作：按目录分批并行执行，只清理本次运行涉及的目录"""
         self.log(f"[Core] 开始回退操作，共 {len(self.rollback_log)} 条记录")
 
-        for operation, original_path, new_path in reversed(self.rollback_log):
-            if operation == 'move':
-                try:
-                    if os.path.exists(new_path):
-                        os.makedirs(os.path.dirname(original_path), exist_ok=True)
-                        FileOperations.safe_move(new_path, original_path)
-                except Exception as e:
-                    self.log(f"[Core] 回退失败 {new_path} -> {original_path}: {str(e)}")
+        engine = RollbackEngine(self.rollback_workers)
+        for path, target, error in engine.run(self.rollback_log):
+            self.log(f"[Core] 回退失败 {path} -> {target}: {error}")
 
-        self._cleanup_and_renumber_folders(dest_dir)
+        FileOperations.prune_empty_dirs(engine.touched_directories | self.touched_directories, dest_dir)
+        self.touched_directories.clear()
+        self._renumber_folders(dest_dir)
+        self._finish_journal()
 
         self.rollback_log.clear()
-        self.log("[Core] 回退操作完成")
\ No newline at end of file
+        self.log("[Core] 回退操作完成")
+
+    def _begin_journal(self, source_dir, dest_dir, progress_callback=None):
+        """在目标目录打开移动日志；无法写入时仅使用内存中的回退记录"""
+        if not self.use_move_journal or self.journal is not None:
+            return
+        journal = MoveJournal(MoveJournal.path_for(dest_dir), self.journal_fsync_interval)
+        try:
+            journal.open(source_dir, dest_dir)
+            self.journal = journal
+        except OSError as e:
+            if progress_callback:
+                self._progress_callback_wrapper(message=f"[Warning] 无法创建移动日志，本次中断后将无法恢复: {str(e)}", core_callback=progress_callback)
+
+    def _journal_operation(self, operation, source, destination):
+        """把已完成的操作追加到移动日志"""
+        if self.journal is None:
+            return
+        try:
+            self.journal.record_done(operation, source, destination)
+        except OSError as e:
+            print(f"写入移动日志失败: {str(e)}")
+
+    def _finish_journal(self):
+        """本次运行已完整结束或已完整回退，删除移动日志"""
+        if self.journal is None:
+            return
+        try:
+            self.journal.complete()
+        except OSError as e:
+            print(f"删除移动日志失败: {str(e)}")
+        self.journal = None
+
+    def _close_journal(self):
+        """关闭移动日志但保留文件，供下次启动时恢复"""
+        if self.journal is None:
+            return
+        try:
+            self.journal.close()
+        except OSError as e:
+            print(f"关闭移动日志失败: {str(e)}")
+        self.journal = None
+
+    def find_interrupted_run(self, dest_dir):
+        """检查目标目录中是否留有上次未完成运行的移动日志，返回 JournalState 或 None
+        日志中既没有已完成操作也没有待执行移动时直接删除
+        """
+        journal_path = MoveJournal.path_for(dest_dir)
+        try:
+            state = MoveJournal.load(journal_path)
+        except (OSError, KeyError) as e:
+            print(f"读取移动日志失败: {str(e)}")
+            return None
+        if state is None:
+            return None
+        if not state.completed_operations() and not state.pending_moves():
+            try:
+                os.remove(journal_path)
+            except OSError:
+                pass
+            return None
+        return state
+
+    def recover_interrupted_run(self, dest_dir, action, progress_callback=None):
+        """恢复上次中断的运行：action 为 "resume" 时执行剩余的计划移动，为 "rollback" 时回退已完成的操作
+        返回处理的条目数
+        """
+        state = self.find_interrupted_run(dest_dir)
+        if state is None:
+            return 0
+
+        if action == "rollback":
+            self.rollback_log = state.completed_operations()
+            count = len(self.rollback_log)
+            self.rollback_operations(dest_dir)
+        else:
+            count = 0
+            for source, destination in state.pending_moves():
+                try:
+                    if os.path.exists(destination):
+                        base_name, file_ext = os.path.splitext(os.path.basename(destination))
+                        destination = FileOperations.get_unique_filename(os.path.dirname(destination), base_name, file_ext)
+                    FileOperations.safe_move(source, destination)
+                    self.touched_directories.add(os.path.dirname(source))
+                    MetadataExtractor.record_file_moved(source, destination)
+                    count += 1
+                except Exception as e:
+                    if progress_callback:
+                        self._progress_callback_wrapper(message=f"[Error] 恢复移动失败 {Path(source).name}: {str(e)}", core_callback=progress_callback)
+            self._cleanup_and_renumber_folders(dest_dir, roots=[state.source_dir, dest_dir])
+
+        try:
+            os.remove(state.file_path)
+        except OSError:
+            pass
+        return count
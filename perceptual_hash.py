@@ -0,0 +1,105 @@
+# perceptual_hash.py
+from config import PERCEPTUAL_HASH_SIZE
+
+
+def compute_dhash(file_path, hash_size=None):
+    """计算图片的差值感知哈希 (dHash)，返回整数；Pillow 不可用或无法解码时返回 None
+    JPEG 通过 draft() 让解码器直接输出缩小的灰度图，避免完整解码大图
+    """
+    hash_size = hash_size or PERCEPTUAL_HASH_SIZE
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        with Image.open(file_path) as img:
+            img.draft('L', (hash_size * 8, hash_size * 8))
+            small = img.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+            pixels = list(small.getdata())
+    except (IOError, OSError, Image.UnidentifiedImageError) as e:
+        print(f"计算感知哈希失败 {file_path}: {str(e)}")
+        return None
+    except Exception as e:
+        print(f"未知错误计算感知哈希 {file_path}: {str(e)}")
+        return None
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(hash1, hash2):
+    """两个哈希之间不同的位数"""
+    return bin(hash1 ^ hash2).count('1')
+
+
+class BKTree:
+    """以汉明距离为度量的 BK 树，按距离阈值查询时利用三角不等式剪枝，无需两两比较"""
+
+    def __init__(self):
+        self._root = None
+
+    def add(self, hash_value, item):
+        """插入一个哈希及其对应的条目，相同哈希的条目共享一个节点"""
+        if self._root is None:
+            self._root = (hash_value, [item], {})
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (hash_value, [item], {})
+                return
+            node = child
+
+    def search(self, hash_value, threshold):
+        """返回与给定哈希距离不超过阈值的 [(距离, 条目)]"""
+        results = []
+        if self._root is None:
+            return results
+
+        candidates = [self._root]
+        while candidates:
+            node_hash, items, children = candidates.pop()
+            distance = hamming_distance(hash_value, node_hash)
+            if distance <= threshold:
+                results.extend((distance, item) for item in items)
+            low, high = distance - threshold, distance + threshold
+            candidates.extend(child for child_distance, child in children.items() if low <= child_distance <= high)
+        return results
+
+
+def group_near_duplicates(hashes, threshold):
+    """把 {路径: 哈希} 按阈值聚成近似重复分组（传递闭包），只返回至少两个文件的分组"""
+    tree = BKTree()
+    for file_path, hash_value in hashes.items():
+        tree.add(hash_value, file_path)
+
+    parent = {file_path: file_path for file_path in hashes}
+
+    def find(file_path):
+        while parent[file_path] != file_path:
+            parent[file_path] = parent[parent[file_path]]
+            file_path = parent[file_path]
+        return file_path
+
+    for file_path, hash_value in hashes.items():
+        root = find(file_path)
+        for _, other in tree.search(hash_value, threshold):
+            other_root = find(other)
+            if other_root != root:
+                parent[other_root] = root
+
+    groups = {}
+    for file_path in sorted(hashes):
+        groups.setdefault(find(file_path), []).append(file_path)
+    return sorted((group for group in groups.values() if len(group) > 1), key=lambda group: group[0])
@@ -0,0 +1,87 @@
+# pipeline.py
+import queue
+import threading
+
+from config import DEFAULT_METADATA_WORKERS, DEFAULT_PIPELINE_QUEUE_SIZE
+
+
+class ScanExtractPipeline:
+    """扫描 -> 日期提取 流水线：扫描线程把文件批次放入有界队列，元数据线程边扫描边提取"""
+
+    _WORKER_DONE = object()
+
+    def __init__(self, scanner, extract_func, workers=None, queue_size=None, batch_size=256):
+        self.scanner = scanner
+        self.extract_func = extract_func
+        self.workers = max(1, workers or DEFAULT_METADATA_WORKERS)
+        self.queue_size = max(1, queue_size or DEFAULT_PIPELINE_QUEUE_SIZE)
+        self.batch_size = batch_size
+
+    def run(self, directory, check_terminate=None):
+        """逐个产出 (类别, 路径, 日期)，队列满时扫描线程阻塞等待（背压）"""
+        scan_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        stop_event = threading.Event()
+
+        def put(q, item):
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def producer():
+            try:
+                for batch in self.scanner.iter_file_batches(directory, batch_size=self.batch_size):
+                    if check_terminate and check_terminate():
+                        break
+                    if not put(scan_queue, batch):
+                        return
+            except Exception as e:
+                print(f"流水线扫描错误: {str(e)}")
+            finally:
+                for _ in range(self.workers):
+                    put(scan_queue, None)
+
+        def consumer():
+            try:
+                while not stop_event.is_set():
+                    try:
+                        batch = scan_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if batch is None:
+                        break
+                    results = []
+                    for category, file_path in batch:
+                        if check_terminate and check_terminate():
+                            break
+                        results.append((category, file_path, self.extract_func(file_path)))
+                    if not put(result_queue, results):
+                        return
+            except Exception as e:
+                print(f"流水线提取错误: {str(e)}")
+            finally:
+                put(result_queue, ScanExtractPipeline._WORKER_DONE)
+
+        threads = [threading.Thread(target=producer)]
+        threads.extend(threading.Thread(target=consumer) for _ in range(self.workers))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        finished_workers = 0
+        try:
+            while finished_workers < self.workers:
+                results = result_queue.get()
+                if results is ScanExtractPipeline._WORKER_DONE:
+                    finished_workers += 1
+                    continue
+                for record in results:
+                    yield record
+        finally:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,105 @@
+# rename_planner.py
+import json
+import os
+
+
+class RenamePlanner:
+    """重命名规划器：在内存中为每个文件确定最终路径，执行前不做逐个 os.path.exists 探测
+    每个目标目录只在第一次用到时 scandir 一次，得到已有文件名集合，之后的冲突全部在集合中解决
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._listings = {}
+        self._planned = set()
+        self.entries = []
+
+    @staticmethod
+    def path_key(path):
+        """路径比较用的规范形式：绝对路径并按平台规则统一大小写"""
+        return os.path.normcase(os.path.abspath(path))
+
+    def _names_in(self, directory):
+        """目录中已占用的文件名集合（规范化大小写后），首次访问时扫描一次"""
+        directory_key = RenamePlanner.path_key(directory)
+        names = self._names.get(directory_key)
+        if names is None:
+            names = set()
+            listing = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        names.add(os.path.normcase(entry.name))
+                        if entry.is_file():
+                            listing.append(entry.name)
+            except OSError:
+                pass
+            self._names[directory_key] = names
+            self._listings[directory_key] = listing
+        return names
+
+    def existing_files(self, directory):
+        """规划开始前目录中已有的文件名（保留原始大小写），与占用集合共用同一次扫描"""
+        self._names_in(directory)
+        return self._listings[RenamePlanner.path_key(directory)]
+
+    def is_taken(self, path):
+        """路径是否已被现有文件或先前规划的文件占用"""
+        directory, name = os.path.split(path)
+        return os.path.normcase(name) in self._names_in(directory)
+
+    def reserve(self, path):
+        """标记路径已被占用"""
+        directory, name = os.path.split(path)
+        self._names_in(directory).add(os.path.normcase(name))
+
+    def release(self, path):
+        """标记路径已空出（文件已规划移走）"""
+        directory, name = os.path.split(path)
+        self._names_in(directory).discard(os.path.normcase(name))
+        self._planned.discard(RenamePlanner.path_key(path))
+
+    def unique_path(self, directory, base_name, extension):
+        """与 FileOperations.get_unique_filename 相同的命名规则，但只在内存中查找空闲名称"""
+        candidate = os.path.join(directory, base_name + extension)
+        counter = 1
+        while self.is_taken(candidate):
+            candidate = os.path.join(directory, f"{base_name}_{counter}{extension}")
+            counter += 1
+        return candidate
+
+    def plan(self, source, directory, base_name, extension, unique_base_name, **details):
+        """为一个文件规划目标路径
+        目标名已被占用时改用 unique_base_name 生成唯一名称；占用者是规划开始前就存在的文件时，
+        在 collides_with 中记录它，供执行阶段做内容相同检查。返回规划条目
+        """
+        source = os.path.abspath(source)
+        desired = os.path.join(directory, base_name + extension)
+        collides_with = None
+
+        if RenamePlanner.path_key(desired) == RenamePlanner.path_key(source):
+            destination = source
+        else:
+            self.release(source)
+            if not self.is_taken(desired):
+                destination = desired
+            else:
+                if RenamePlanner.path_key(desired) not in self._planned:
+                    collides_with = desired
+                destination = self.unique_path(directory, unique_base_name, extension)
+
+        self.reserve(destination)
+        self._planned.add(RenamePlanner.path_key(destination))
+
+        entry = dict(details, source=source, destination=destination, collides_with=collides_with)
+        self.entries.append(entry)
+        return entry
+
+    def export(self, file_path):
+        """把规划结果写成 JSON 文件，便于执行前后检查"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                [{'source': entry['source'], 'destination': entry['destination'],
+                  'collides_with': entry['collides_with']} for entry in self.entries],
+                f, indent=2, ensure_ascii=False
+            )
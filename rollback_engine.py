@@ -0,0 +1,109 @@
+# rollback_engine.py
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DEFAULT_ROLLBACK_WORKERS
+from file_operations import FileOperations
+from move_engine import move_file
+
+
+class RollbackEngine:
+    """并行回退引擎：把回退记录折叠成每个文件一次"当前位置 → 原始位置"的移动，按原始目录分批，
+    每个目录只创建一次，各目录的批次在线程池中并行执行；目标名仍被其他待回退文件占用的冲突条目最后串行执行
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max(1, max_workers or DEFAULT_ROLLBACK_WORKERS)
+        self.touched_directories = set()
+
+    @staticmethod
+    def plan(operations):
+        """把按执行顺序排列的 [(操作, 路径1, 路径2)] 整理成回退计划
+        返回 (链接恢复列表 [(重复文件当前路径, 保留文件当前路径)]（按逆序）, 移动回退列表 [(当前路径, 原始路径)]（按逆序）)
+        同一文件被多次移动（A → B → C）时只保留一次 C → A
+        """
+        origins = {}
+        order = {}
+        links = []
+        tracked = defaultdict(list)
+
+        for index, (operation, first, second) in enumerate(operations):
+            if operation == 'move':
+                origins[second] = origins.pop(first, first)
+                order.pop(first, None)
+                order[second] = index
+                for link, position in tracked.pop(first, []):
+                    link[position] = second
+                    tracked[second].append((link, position))
+            elif operation == 'link':
+                link = [first, second]
+                links.append(link)
+                tracked[first].append((link, 0))
+                tracked[second].append((link, 1))
+
+        reversals = sorted(((current, origin) for current, origin in origins.items() if current != origin),
+                           key=lambda item: order[item[0]], reverse=True)
+        return [tuple(link) for link in reversed(links)], reversals
+
+    def run(self, operations):
+        """执行回退，返回失败列表 [(路径, 目标路径, 错误信息)]"""
+        links, reversals = RollbackEngine.plan(operations)
+        failures = []
+
+        for duplicate, keeper in links:
+            try:
+                if os.path.exists(duplicate) and os.path.exists(keeper):
+                    FileOperations.restore_independent_copy(duplicate, keeper)
+            except Exception as e:
+                failures.append((duplicate, keeper, str(e)))
+
+        current_paths = {current for current, _ in reversals}
+        target_counts = defaultdict(int)
+        for _, origin in reversals:
+            target_counts[origin] += 1
+
+        batches = defaultdict(list)
+        conflicts = []
+        for current, origin in reversals:
+            if origin in current_paths or target_counts[origin] > 1:
+                conflicts.append((current, origin))
+            else:
+                batches[os.path.dirname(origin)].append((current, origin))
+
+        if self.max_workers == 1 or len(batches) < 2:
+            for directory, items in batches.items():
+                failures.extend(self._run_batch(directory, items))
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                for batch_failures in executor.map(lambda batch: self._run_batch(*batch), batches.items()):
+                    failures.extend(batch_failures)
+
+        for current, origin in conflicts:
+            failures.extend(self._run_batch(os.path.dirname(origin), [(current, origin)]))
+
+        return failures
+
+    def _run_batch(self, directory, items):
+        """回退同一原始目录下的一批文件：目录只创建一次，然后逐个重命名"""
+        failures = []
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            return [(current, origin, str(e)) for current, origin in items]
+
+        for current, origin in items:
+            if not os.path.exists(current):
+                continue
+            try:
+                RollbackEngine._rename(current, origin)
+                self.touched_directories.add(os.path.dirname(current))
+            except OSError as e:
+                failures.append((current, origin, str(e)))
+        return failures
+
+    @staticmethod
+    def _rename(current, origin):
+        """同一设备上直接 rename，跨设备时复制校验后删除"""
+        move_file(current, origin)
+        FileOperations.forget_file_stat(current)
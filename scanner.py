@@ -0,0 +1,184 @@
+# scanner.py
+import os
+import queue
+import threading
+
+from config import BACKUP_FOLDER_NAME, DEFAULT_SCAN_WORKERS
+from file_operations import FileOperations
+
+
+class DirectoryScanner:
+    """基于 os.scandir 的单遍目录扫描器，扫描时顺便缓存文件状态"""
+
+    CATEGORIES = ('images', 'videos', 'documents', 'other')
+
+    def __init__(self, image_formats, video_formats, document_formats, other_formats=(), exclude_dirs=None):
+        self.extension_table = DirectoryScanner.build_extension_table(
+            image_formats, video_formats, document_formats, other_formats)
+        self.exclude_dirs = set()
+        for exclude_dir in exclude_dirs or ():
+            if exclude_dir:
+                self.exclude_dirs.add(os.path.normcase(os.path.abspath(exclude_dir)))
+
+    @staticmethod
+    def build_extension_table(image_formats, video_formats, document_formats, other_formats=()):
+        """预先计算 扩展名 -> 类别 的映射表，优先级与逐个判断时保持一致"""
+        table = {}
+        for category, formats in (('other', other_formats), ('documents', document_formats),
+                                  ('videos', video_formats), ('images', image_formats)):
+            for ext in formats:
+                table[ext.lower()] = category
+        return table
+
+    @staticmethod
+    def new_results():
+        """创建空的扫描结果字典"""
+        return {category: [] for category in DirectoryScanner.CATEGORIES}
+
+    @staticmethod
+    def is_skipped_dir(name):
+        """隐藏目录和备份目录不参与扫描"""
+        return (name.startswith('.') or BACKUP_FOLDER_NAME.lower() in name.lower()
+                or "BACKUP" in name.upper())
+
+    @staticmethod
+    def is_skipped_file(name):
+        """隐藏文件和压缩包不参与扫描"""
+        return name.startswith('.') or name.endswith('.zip')
+
+    def is_excluded(self, path):
+        """判断路径是否位于排除目录之内"""
+        if not self.exclude_dirs:
+            return False
+        path = os.path.normcase(path)
+        for exclude_dir in self.exclude_dirs:
+            if path == exclude_dir or path.startswith(exclude_dir.rstrip(os.sep) + os.sep):
+                return True
+        return False
+
+    def classify(self, name):
+        """根据扩展名返回文件类别"""
+        return self.extension_table.get(os.path.splitext(name)[1].lower(), 'other')
+
+    def scan_one_directory(self, directory, results, recursive=True):
+        """列出单个目录：文件写入 results，返回需要继续扫描的子目录"""
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    try:
+                        if entry.is_dir():
+                            if (recursive and not entry.is_symlink() and not DirectoryScanner.is_skipped_dir(name)
+                                    and os.path.normcase(entry.path) not in self.exclude_dirs):
+                                subdirs.append(entry.path)
+                            continue
+                        if not entry.is_file() or DirectoryScanner.is_skipped_file(name):
+                            continue
+                    except OSError:
+                        continue
+
+                    file_path = entry.path
+                    try:
+                        FileOperations.cache_file_stat(file_path, entry.stat())
+                    except OSError:
+                        pass
+
+                    results[self.extension_table.get(os.path.splitext(name)[1].lower(), 'other')].append(file_path)
+        except OSError as e:
+            print(f"扫描目录失败 {directory}: {str(e)}")
+        return subdirs
+
+    def scan_directory(self, directory, recursive=True):
+        """单线程扫描目录，recursive 为 False 时只扫描目录的直接内容"""
+        directory = os.path.abspath(directory)
+        results = DirectoryScanner.new_results()
+
+        if self.is_excluded(directory):
+            return results
+
+        pending = [directory]
+        while pending:
+            subdirs = self.scan_one_directory(pending.pop(), results, recursive)
+            pending.extend(reversed(subdirs))
+
+        return results
+
+    def iter_file_batches(self, directory, recursive=True, batch_size=256):
+        """逐个目录产出 (类别, 路径) 批次，供流水线边扫描边处理"""
+        directory = os.path.abspath(directory)
+        if self.is_excluded(directory):
+            return
+
+        pending = [directory]
+        while pending:
+            results = DirectoryScanner.new_results()
+            subdirs = self.scan_one_directory(pending.pop(), results, recursive)
+            pending.extend(reversed(subdirs))
+
+            batch = []
+            for category in DirectoryScanner.CATEGORIES:
+                for file_path in results[category]:
+                    batch.append((category, file_path))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+            if batch:
+                yield batch
+
+
+class ParallelDirectoryWalker:
+    """多线程目录遍历器：工作线程从共享队列领取目录，每个目录只列出一次"""
+
+    def __init__(self, scanner, max_workers=None):
+        self.scanner = scanner
+        self.max_workers = max(1, max_workers or DEFAULT_SCAN_WORKERS)
+
+    def walk(self, directory, recursive=True, check_terminate=None):
+        """并行扫描目录树，各线程结果写入独立缓冲区，结束后合并"""
+        directory = os.path.abspath(directory)
+
+        if not recursive or self.max_workers == 1:
+            return self.scanner.scan_directory(directory, recursive)
+
+        if self.scanner.is_excluded(directory):
+            return DirectoryScanner.new_results()
+
+        dir_queue = queue.Queue()
+        dir_queue.put(directory)
+        buffers = [DirectoryScanner.new_results() for _ in range(self.max_workers)]
+
+        def worker(results):
+            while True:
+                path = dir_queue.get()
+                try:
+                    if path is None:
+                        return
+                    if check_terminate and check_terminate():
+                        continue
+                    for subdir in self.scanner.scan_one_directory(path, results):
+                        dir_queue.put(subdir)
+                except Exception as e:
+                    print(f"扫描线程错误 {path}: {str(e)}")
+                finally:
+                    dir_queue.task_done()
+
+        threads = []
+        for results in buffers:
+            thread = threading.Thread(target=worker, args=(results,))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        dir_queue.join()
+        for _ in threads:
+            dir_queue.put(None)
+        for thread in threads:
+            thread.join()
+
+        merged = DirectoryScanner.new_results()
+        for category in DirectoryScanner.CATEGORIES:
+            for results in buffers:
+                merged[category].extend(results[category])
+            merged[category].sort()
+        return merged
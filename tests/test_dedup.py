@@ -0,0 +1,51 @@
+# tests/test_dedup.py
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import DuplicateDetector
+
+
+class DuplicateDetectorSymlinkTest(unittest.TestCase):
+    """符号链接与其所指文件内容相同，但不能被当成重复文件"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), "需要符号链接支持")
+    def test_symlink_is_not_duplicate_of_target(self):
+        target = self._write('b_photo.jpg', b'photo data' * 100)
+        alias = os.path.join(self.directory, 'a_alias.jpg')
+        try:
+            os.symlink('b_photo.jpg', alias)
+        except OSError:
+            self.skipTest("无法创建符号链接")
+
+        duplicate_map = DuplicateDetector().find_duplicates([alias, target])
+
+        self.assertEqual(duplicate_map, {})
+
+    def test_identical_copies_are_detected(self):
+        first = self._write('a.jpg', b'same content' * 100)
+        second = self._write('b.jpg', b'same content' * 100)
+
+        duplicate_map = DuplicateDetector().find_duplicates([second, first])
+
+        self.assertEqual(duplicate_map, {second: first})
+
+
+if __name__ == '__main__':
+    unittest.main()
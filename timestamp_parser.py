@@ -0,0 +1,132 @@
+# timestamp_parser.py
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+
+DATE_SEPARATORS = ':-/'
+TIME_SEPARATORS = 'T '
+
+PARSE_CACHE_SIZE = 8192
+
+
+def _int(text):
+    """纯数字字段转整数，含非数字字符时返回 None"""
+    if not text.isdigit():
+        return None
+    return int(text)
+
+
+def _split_fields(text):
+    """按固定宽度切分日期时间
+    支持 YYYY:MM:DD[ HH:MM:SS]、YYYY-MM-DD[THH:MM:SS]、YYYY/MM/DD、YYYYMMDD[ HHMMSS]
+    返回 (年, 月, 日, 时, 分, 秒, 剩余部分)，不符合固定布局时返回 None
+    """
+    length = len(text)
+    if length >= 10 and text[4] in DATE_SEPARATORS and text[7] == text[4]:
+        date_fields = (text[0:4], text[5:7], text[8:10])
+        pos = 10
+    elif length >= 8 and text[:8].isdigit() and (length == 8 or not text[8].isdigit()):
+        date_fields = (text[0:4], text[4:6], text[6:8])
+        pos = 8
+    else:
+        return None
+
+    time_fields = ('0', '0', '0')
+    if pos < length and text[pos] in TIME_SEPARATORS:
+        clock = text[pos + 1:]
+        if len(clock) >= 8 and clock[2] == ':' and clock[5] == ':':
+            time_fields = (clock[0:2], clock[3:5], clock[6:8])
+            pos += 9
+        elif len(clock) >= 6 and clock[:6].isdigit():
+            time_fields = (clock[0:2], clock[2:4], clock[4:6])
+            pos += 7
+        elif len(clock) >= 5 and clock[2] == ':':
+            time_fields = (clock[0:2], clock[3:5], '0')
+            pos += 6
+        else:
+            return None
+
+    values = [_int(field) for field in date_fields + time_fields]
+    if None in values:
+        return None
+    return tuple(values) + (text[pos:],)
+
+
+def _parse_offset(rest):
+    """解析秒小数之后的时区部分：空、Z/UTC、±HH:MM、±HHMM、±HH
+    返回 (是否可识别, timezone 或 None)
+    """
+    if rest.startswith('.'):
+        pos = 1
+        while pos < len(rest) and rest[pos].isdigit():
+            pos += 1
+        rest = rest[pos:]
+
+    rest = rest.strip()
+    if not rest:
+        return True, None
+    if rest in ('Z', 'z', 'UTC', 'GMT'):
+        return True, timezone.utc
+    if rest[0] not in '+-':
+        return False, None
+
+    digits = rest[1:].replace(':', '')
+    if len(digits) not in (2, 4) or not digits.isdigit():
+        return False, None
+    minutes = int(digits[:2]) * 60 + (int(digits[2:]) if len(digits) == 4 else 0)
+    if minutes >= 24 * 60:
+        return False, None
+    if rest[0] == '-':
+        minutes = -minutes
+    return True, timezone(timedelta(minutes=minutes))
+
+
+def _to_naive(result, to_local):
+    """带时区的结果转换为本地时间（或保留字面时间）后去掉时区"""
+    if result is None or result.tzinfo is None:
+        return result
+    if to_local:
+        return result.astimezone().replace(tzinfo=None)
+    return result.replace(tzinfo=None)
+
+
+def _parse_with_dateutil(text):
+    """兜底：交给 dateutil 解析不常见的格式，未安装时返回 None"""
+    try:
+        from dateutil import parser
+    except ImportError:
+        return None
+    try:
+        return parser.parse(text)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_timestamp(text, to_local=True):
+    """解析 EXIF / ISO-8601 日期字符串，返回不带时区的 datetime，无法解析时返回 None
+    常见固定宽度格式通过切片直接转换，只有不规则的字符串才交给 dateutil；
+    to_local 为真时带时区的时间转换为本地时间，否则保留字面时间
+    """
+    if not isinstance(text, str):
+        return None
+    text = text.strip().rstrip('\x00')
+    if not text:
+        return None
+
+    fields = _split_fields(text)
+    if fields is not None:
+        year, month, day, hour, minute, second, rest = fields
+        if year == 0 and month == 0 and day == 0:
+            return None
+        recognised, tzinfo = _parse_offset(rest)
+        if recognised:
+            try:
+                return _to_naive(datetime(year, month, day, hour, minute, second, tzinfo=tzinfo), to_local)
+            except (ValueError, OverflowError):
+                return None
+
+    try:
+        return _to_naive(_parse_with_dateutil(text), to_local)
+    except (ValueError, OverflowError, OSError):
+        return None
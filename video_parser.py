@@ -0,0 +1,86 @@
+# video_parser.py
+import struct
+from datetime import datetime, timedelta, timezone
+
+from mapped_io import MappedFile
+
+
+ISO_BMFF_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.3gp')
+
+MP4_EPOCH = datetime(1904, 1, 1, tzinfo=timezone.utc)
+
+MAX_BOX_SCAN = 64
+
+
+class BMFFDateReader:
+    """ISO-BMFF (MP4/MOV) 容器解析器：内存映射文件后沿顶层 box 找到 moov/mvhd 直接读取创建时间"""
+
+    @staticmethod
+    def is_supported(file_path):
+        """判断文件是否为本解析器支持的容器"""
+        return file_path.lower().endswith(ISO_BMFF_EXTENSIONS)
+
+    @staticmethod
+    def read_creation_time(file_path):
+        """读取 mvhd 中的创建时间
+        返回 (是否解析成功, 本地时间)；创建时间为 0 时视为没有日期
+        """
+        with MappedFile(file_path) as mapped:
+            moov = BMFFDateReader._find_box(mapped, 0, mapped.size, b'moov')
+            if moov is None:
+                return False, None
+
+            mvhd = BMFFDateReader._find_box(mapped, moov[0], moov[1], b'mvhd')
+            if mvhd is None:
+                return False, None
+
+            header = mapped.read(mvhd[0], min(mvhd[1] - mvhd[0], 20))
+            if len(header) < 8:
+                return False, None
+
+            version = header[0]
+            if version == 1:
+                if len(header) < 12:
+                    return False, None
+                creation_time = struct.unpack_from('>Q', header, 4)[0]
+            else:
+                creation_time = struct.unpack_from('>I', header, 4)[0]
+
+        if creation_time == 0:
+            return True, None
+
+        try:
+            utc_time = MP4_EPOCH + timedelta(seconds=creation_time)
+            return True, utc_time.astimezone().replace(tzinfo=None)
+        except (OverflowError, OSError, ValueError):
+            return False, None
+
+    @staticmethod
+    def _find_box(mapped, start, end, box_type):
+        """在 [start, end) 范围内查找指定类型的 box，返回其内容的 (起始, 结束) 偏移"""
+        pos = start
+        for _ in range(MAX_BOX_SCAN):
+            if pos + 8 > end:
+                return None
+
+            header = mapped.read(pos, 16)
+            if len(header) < 8:
+                return None
+
+            size, current_type = struct.unpack_from('>I4s', header, 0)
+            header_size = 8
+            if size == 1:
+                if len(header) < 16:
+                    return None
+                size = struct.unpack_from('>Q', header, 8)[0]
+                header_size = 16
+            elif size == 0:
+                size = end - pos
+
+            if size < header_size:
+                return None
+
+            if current_type == box_type:
+                return pos + header_size, min(pos + size, end)
+            pos += size
+        return None